@@ -0,0 +1,214 @@
+"""
+Bulk search from the command line, for offline jobs that don't need the HTTP API.
+
+Reads one query per line from a file (or stdin), searches the queries concurrently under per-engine
+rate limits and writes one JSON line per query as soon as it is done. With --checkpoint, finished
+lines are recorded, so running the same command again after an interruption resumes where it stopped.
+
+    python bulk_search.py queries.txt -o results.jsonl --checkpoint results.ckpt --concurrency 16 --rate 2
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from core.config_loader import load_config
+from core.engine_loader import EngineLoader
+from core.plugin_loader import PluginLoader
+from core.proxy_pool import ProxyPool, get_proxy_pool_config
+from core.engine_stats import EngineStats
+from core.rate_limiter import RateLimiter
+from core.search_modes.normal import normal_search
+from core.search_modes.results_merger import results_merger
+from core.search_result import to_builtin, merged_to_dict
+
+
+def parse_args():
+    configs = load_config()
+    parser = argparse.ArgumentParser(description="Search many queries with MOA and write the results as JSON lines.")
+    parser.add_argument("input", nargs="?", default="-", help="File with one query per line, '-' reads stdin (default)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file, '-' writes stdout (default)")
+    parser.add_argument("--checkpoint", help="File recording finished input lines. An existing checkpoint resumes the run")
+    parser.add_argument("--engines", nargs="+", default=configs.get("active_engines"), help="Engine names, default all engines of the category")
+    parser.add_argument("--categories", default=configs.get("default_category", "general"), help="Engine category when no engines are given")
+    parser.add_argument("--plugins", nargs="+", default=[], help="Pre plugins to run for every query")
+    parser.add_argument("--per-engine", action="store_true", help="Write the results of every engine instead of the merged results")
+    parser.add_argument("--limit", type=int, default=configs.get("limit"), help="Number of results per engine")
+    parser.add_argument("--pageno", type=int, default=configs.get("pageno", 1))
+    parser.add_argument("--safesearch", type=int, default=configs.get("safesearch", 0))
+    parser.add_argument("--time-range", default="")
+    parser.add_argument("--language", default=configs.get("language", ""))
+    parser.add_argument("--country", default=configs.get("country", ""))
+    parser.add_argument("--concurrency", type=int, default=8, help="Queries searched at the same time")
+    parser.add_argument("--rate", type=float, default=1.0, help="Calls per second to each engine, 0 for no limit")
+    parser.add_argument("--engine-rate", action="append", default=[], metavar="ENGINE=RATE", help="Calls per second for one engine, overrides --rate")
+    parser.add_argument("--burst", type=float, default=1, help="Calls an engine may get at once after being idle")
+    return parser.parse_args(), configs
+
+
+def read_queries(stream, done: set):
+    """Yields (line number, query) for the lines that are not empty and not finished yet."""
+    for line_number, line in enumerate(stream, start=1):
+        query = line.strip()
+        if query and line_number not in done:
+            yield line_number, query
+
+
+def read_checkpoint(path) -> set:
+    try:
+        with open(path, "r") as f:
+            return {int(line) for line in f if line.strip().isdigit()}
+    except FileNotFoundError:
+        return set()
+
+
+def search_one(query, args, selected_engines, selected_pre_plugins, loader, logger, proxy_pool, engine_stats, rate_limiter, near_duplicates):
+    search_params = {
+        "query": query,
+        "page": args.pageno,
+        "safesearch": args.safesearch,
+        "time_range": args.time_range,
+        "num_results": args.limit,
+        "locale": args.language,
+        "country": args.country,
+    }
+    results, pre_plugin_outputs = normal_search(
+        max_threads=len(selected_engines) + len(selected_pre_plugins) or 1,
+        selected_engines=selected_engines,
+        loader=loader,
+        logger=logger,
+        search_params=search_params,
+        selected_pre_plugins=selected_pre_plugins,
+        q=query,
+        limit=args.limit,
+        proxy_pool=proxy_pool,
+        engine_stats=engine_stats,
+        rate_limiter=rate_limiter,
+    )
+    errors = {name: data["error"] for name, data in results.items() if isinstance(data, dict) and data.get("error")}
+    if args.per_engine:
+        number_of_results = sum(len(data["results"]) for data in results.values() if isinstance(data, dict) and isinstance(data.get("results"), list))
+        output = to_builtin(results)
+    else:
+        merged = results_merger(results, near_duplicates)
+        number_of_results = len(merged)
+        output = [merged_to_dict(engine, result) for engine, result in merged.values()]
+    return {
+        "query": query,
+        "number_of_results": number_of_results,
+        "results": output,
+        "errors": errors,
+        "pre_plugins": to_builtin(pre_plugin_outputs),
+    }, len(errors) == len(selected_engines)
+
+
+def main():
+    args, configs = parse_args()
+    logging.basicConfig(level=getattr(logging, configs.get("logging_level", "WARNING").upper(), logging.WARNING), stream=sys.stderr)
+    logger = logging.getLogger("bulk_search")
+
+    loader = EngineLoader()
+    ploader = PluginLoader()
+    engine_status = loader.list_engines()
+    selected_engines = args.engines or engine_status.get(args.categories.lower(), engine_status["general"])
+    selected_pre_plugins = []
+    for plugin_name in args.plugins:
+        plugin = ploader.get_plugin(plugin_name)
+        if plugin and plugin.get_type().lower() == "pre":
+            selected_pre_plugins.append(plugin)
+        else:
+            logger.warning("Pre plugin '%s' not found, it is skipped.", plugin_name)
+
+    proxy_pool_configs = configs.get("proxy_pool") or {}
+    proxy_pool = ProxyPool(
+        get_proxy_pool_config(configs["proxys"]) if configs.get("enabled_proxy") else [],
+        strategy=proxy_pool_configs.get("strategy", "round_robin"),
+        max_failures=proxy_pool_configs.get("max_failures", 3),
+        rest_time=proxy_pool_configs.get("rest_time", 120),
+        captcha_rest_time=proxy_pool_configs.get("captcha_rest_time", 600),
+        connections=proxy_pool_configs.get("connections", 10),
+    )
+    rates = {}
+    for item in args.engine_rate:
+        name, _, rate = item.partition("=")
+        rates[name] = float(rate)
+    rate_limiter = RateLimiter(rates, default_rate=args.rate, burst=args.burst)
+    engine_stats = EngineStats(1000)
+    near_duplicates_configs = configs.get("near_duplicates") or {}
+    near_duplicates = {
+        "max_distance": near_duplicates_configs.get("max_distance", 6),
+        "bands": near_duplicates_configs.get("bands", 7),
+        "min_tokens": near_duplicates_configs.get("min_tokens", 4),
+    } if near_duplicates_configs.get("enabled") else None
+
+    done = read_checkpoint(args.checkpoint) if args.checkpoint else set()
+    # Resumed runs append, lines written just before an interruption may show up twice but are never lost
+    input_file = sys.stdin if args.input == "-" else open(args.input, "r")
+    output_file = sys.stdout if args.output == "-" else open(args.output, "a" if done else "w")
+    checkpoint_file = open(args.checkpoint, "a") if args.checkpoint else None
+
+    counters = {"queries": 0, "failed": 0, "results": 0, "skipped": len(done)}
+    started = time.monotonic()
+    executor = ThreadPoolExecutor(args.concurrency)
+    pending = {}
+
+    def finish(future):
+        line_number, query = pending.pop(future)
+        counters["queries"] += 1
+        try:
+            line, failed = future.result()
+        except Exception as e:
+            line, failed = {"query": query, "number_of_results": 0, "results": [], "errors": {"search": str(e)}}, True
+        counters["failed"] += failed
+        counters["results"] += line["number_of_results"]
+        output_file.write(json.dumps({"line": line_number, **line}, ensure_ascii=False) + "\n")
+        output_file.flush()
+        if checkpoint_file:
+            checkpoint_file.write(f"{line_number}\n")
+            checkpoint_file.flush()
+
+    try:
+        for line_number, query in read_queries(input_file, done):
+            # At most `concurrency` queries in flight, so memory stays bounded however long the input is
+            while len(pending) >= args.concurrency:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    finish(future)
+            future = executor.submit(
+                search_one, query, args, selected_engines, selected_pre_plugins, loader, logger,
+                proxy_pool, engine_stats, rate_limiter, near_duplicates,
+            )
+            pending[future] = (line_number, query)
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                finish(future)
+    except KeyboardInterrupt:
+        # Write what already finished, queries still running are dropped and searched again on resume
+        for future in list(pending):
+            if future.done() and not future.cancelled():
+                finish(future)
+            else:
+                future.cancel()
+        print("Interrupted, run the same command again to resume." if checkpoint_file else "Interrupted.", file=sys.stderr)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        for f in (input_file, output_file, checkpoint_file):
+            if f and f not in (sys.stdin, sys.stdout):
+                f.close()
+
+    elapsed = time.monotonic() - started
+    summary = {
+        **counters,
+        "seconds": round(elapsed, 1),
+        "queries_per_second": round(counters["queries"] / elapsed, 2) if elapsed else None,
+        "engines": engine_stats.stats(),
+        "rate_limit_wait_seconds": rate_limiter.stats(),
+        "proxies": proxy_pool.stats(),
+    }
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
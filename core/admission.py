@@ -0,0 +1,130 @@
+import asyncio
+from collections import defaultdict, deque
+
+
+class AdmissionRejected(Exception):
+    """Raised when a search cannot be admitted. retry_after is in seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Limits the number of in-flight searches.
+
+    Requests over the limit wait in a bounded FIFO queue for at most max_queue_time
+    seconds. "high" priority waiters are always woken before "low" ones, and low
+    priority traffic (stream, prefetch) may only use low_priority_share of the slots.
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, max_in_flight=32, max_queue=64, max_queue_time=2.0,
+                 per_client_limit=0, low_priority_share=0.5, retry_after=1):
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.max_queue = max(0, int(max_queue))
+        self.max_queue_time = float(max_queue_time)
+        self.per_client_limit = int(per_client_limit or 0)
+        self.low_priority_limit = max(1, int(self.max_in_flight * float(low_priority_share)))
+        self.retry_after = int(retry_after)
+
+        self.in_flight = 0
+        self.low_in_flight = 0
+        self.clients = defaultdict(int)
+        self.waiters = {"high": deque(), "low": deque()}
+        self.counters = {"admitted": 0, "waited": 0, "rejected": 0, "timed_out": 0}
+
+    def _can_start(self, priority: str) -> bool:
+        if self.in_flight >= self.max_in_flight:
+            return False
+        if priority == "low" and self.low_in_flight >= self.low_priority_limit:
+            return False
+        return True
+
+    def _start(self, priority: str):
+        self.in_flight += 1
+        if priority == "low":
+            self.low_in_flight += 1
+        self.counters["admitted"] += 1
+
+    def _wake(self):
+        for priority in ("high", "low"):
+            waiters = self.waiters[priority]
+            while waiters and self._can_start(priority):
+                waiter = waiters.popleft()
+                if waiter.done():
+                    continue
+                self._start(priority)
+                waiter.set_result(True)
+
+    def _reject(self, client, reason: str):
+        if client is not None:
+            self._forget_client(client)
+        self.counters["rejected"] += 1
+        raise AdmissionRejected(reason, self.retry_after)
+
+    def _forget_client(self, client):
+        self.clients[client] -= 1
+        if self.clients[client] <= 0:
+            del self.clients[client]
+
+    async def acquire(self, client: str | None = None, priority: str = "high"):
+        """Waits for a free slot. Raises AdmissionRejected if none becomes available in time."""
+        priority = "low" if priority == "low" else "high"
+
+        if client is not None:
+            if self.per_client_limit and self.clients[client] >= self.per_client_limit:
+                self.counters["rejected"] += 1
+                raise AdmissionRejected("Too many concurrent searches for this client", self.retry_after)
+            self.clients[client] += 1
+
+        # Only take the fast path when nobody of the same or higher priority is waiting
+        queued_ahead = self.waiters["high"] or (priority == "low" and self.waiters["low"])
+        if not queued_ahead and self._can_start(priority):
+            self._start(priority)
+            return
+
+        if sum(len(w) for w in self.waiters.values()) >= self.max_queue:
+            self._reject(client, "Search capacity exhausted")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters[priority].append(waiter)
+        self.counters["waited"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_queue_time)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted right as we gave up, hand it to the next waiter
+                self.release(client=None, priority=priority)
+            else:
+                waiter.cancel()
+                try:
+                    self.waiters[priority].remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.CancelledError):
+                if client is not None:
+                    self._forget_client(client)
+                raise
+            self.counters["timed_out"] += 1
+            self._reject(client, "Timed out waiting for search capacity")
+
+    def release(self, client: str | None = None, priority: str = "high"):
+        self.in_flight = max(0, self.in_flight - 1)
+        if priority == "low":
+            self.low_in_flight = max(0, self.low_in_flight - 1)
+        if client is not None and client in self.clients:
+            self._forget_client(client)
+        self._wake()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "low_priority_in_flight": self.low_in_flight,
+            "queued": {priority: len(waiters) for priority, waiters in self.waiters.items()},
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            **self.counters,
+        }
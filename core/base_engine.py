@@ -1,11 +1,33 @@
 import yaml
+import threading
 from pathlib import Path
 from abc import ABC, abstractmethod
 
+
+class CaptchaError(Exception):
+    """Raised by engines when the search engine answered with a CAPTCHA page."""
+
+
+def is_blocked(e: Exception) -> bool:
+    """True for CAPTCHA pages and 429 Too Many Requests responses."""
+    if isinstance(e, CaptchaError):
+        return True
+    response = getattr(e, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+
 class BaseEngine(ABC):
-    
+
+    # Default cap on a response body, can be changed per engine with "max_bytes" in engine_params.yml (0 = no cap)
+    DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+    # Result blocks read beyond the requested number, since some blocks are dropped while parsing
+    EARLY_STOP_SLACK = 2
+
     def __init__(self):
         self.config = self.load_config()
+        self.byte_stats = {"responses": 0, "bytes": 0, "over_budget": 0, "stopped_early": 0}
+        self._byte_stats_lock = threading.Lock()
+        self._last_error = threading.local()
     
     @classmethod
     def load_config(cls):
@@ -26,3 +48,62 @@ class BaseEngine(ABC):
     def get_type(self) -> str:
 
         return self.config.get("type", "general")
+
+    def get_hosts(self) -> list:
+        """Hosts the engine connects to, used for the startup warm-up."""
+        return []
+
+    def error_result(self, e: Exception) -> dict:
+        """Output of a failed search. Whether the engine was blocked is kept for the proxy pool, see was_blocked()."""
+        self._last_error.blocked = is_blocked(e)
+        return {"error": str(e)}
+
+    def was_blocked(self) -> bool:
+        """True if the last error_result() of the calling thread was a CAPTCHA or a 429. Resets the flag."""
+        blocked = getattr(self._last_error, "blocked", False)
+        self._last_error.blocked = False
+        return blocked
+
+    def get_max_bytes(self) -> int:
+        return self.config.get("max_bytes", self.DEFAULT_MAX_BYTES)
+
+    def read_text(self, response, stop_marker: bytes | None = None, stop_after: int | None = None) -> str:
+        """
+        Reads the body of a response requested with stream=True, at most max_bytes of it.
+        If stop_marker (the start of a result block) and stop_after (the number of wanted results) are given,
+        reading stops as soon as enough result blocks have arrived. lxml copes with the truncated page.
+        """
+        max_bytes = self.get_max_bytes()
+        chunks = []
+        received = 0
+        seen = 0
+        tail = b""
+        stopped_early = False
+        try:
+            for chunk in response.iter_content(chunk_size=16384):
+                received += len(chunk)
+                if max_bytes and received > max_bytes:
+                    self._record_bytes(received, over_budget=True)
+                    raise Exception(f"Response body exceeds {max_bytes} bytes")
+                chunks.append(chunk)
+
+                if stop_marker and stop_after:
+                    # The tail keeps markers split between two chunks countable
+                    window = tail + chunk
+                    seen += window.count(stop_marker)
+                    tail = window[len(window) - len(stop_marker) + 1:]
+                    if seen > stop_after + self.EARLY_STOP_SLACK:
+                        stopped_early = True
+                        break
+        finally:
+            response.close()
+
+        self._record_bytes(received, stopped_early=stopped_early)
+        return b"".join(chunks).decode(response.encoding or "utf-8", errors="replace")
+
+    def _record_bytes(self, received: int, over_budget: bool = False, stopped_early: bool = False):
+        with self._byte_stats_lock:
+            self.byte_stats["responses"] += 1
+            self.byte_stats["bytes"] += received
+            self.byte_stats["over_budget"] += over_budget
+            self.byte_stats["stopped_early"] += stopped_early
@@ -27,3 +27,15 @@ class BasePlugin(ABC):
     def get_type(self) -> str:
 
         return self.config.get("type", "post")
+
+    def is_pure(self) -> bool:
+        """Pure plugins only depend on the query and their params, so their outputs can be cached."""
+        return bool(self.config.get("pure", False))
+
+    def is_inline(self) -> bool:
+        """Cheap pure plugins can run inline instead of taking a worker thread."""
+        return self.is_pure() and self.get_execution() != "process" and bool(self.config.get("inline", False))
+
+    def get_execution(self) -> str:
+        """'thread' (default) or 'process' for CPU-heavy plugins that should run in the plugin process pool."""
+        return self.config.get("execution", "thread")
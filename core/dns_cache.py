@@ -0,0 +1,52 @@
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+_original_getaddrinfo = socket.getaddrinfo
+
+
+class DNSCache:
+    """
+    In-process cache for socket.getaddrinfo with a fixed TTL.
+    Only successful lookups are cached, the oldest entries are dropped after max_entries.
+    """
+
+    def __init__(self, ttl: float = 300, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        with self.lock:
+            cached = self.entries.get(key)
+            if cached and cached[0] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        result = _original_getaddrinfo(host, port, family, type, proto, flags)
+
+        with self.lock:
+            self.entries[key] = (now + self.ttl, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return result
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses, "ttl": self.ttl}
+
+
+def install_dns_cache(ttl: float = 300, max_entries: int = 1024) -> DNSCache:
+    """Routes every name lookup of the process (requests, urllib3, ...) through a DNSCache."""
+    cache = DNSCache(ttl, max_entries)
+    socket.getaddrinfo = cache.getaddrinfo
+    return cache
@@ -0,0 +1,142 @@
+import random
+import threading
+import time
+from collections import defaultdict, deque
+
+
+class EngineStats:
+    """
+    Rolling statistics for each engine over its last `window` searches: latency, errors
+    and how many unique results it added to merged responses.
+    """
+
+    def __init__(self, window: int = 200):
+        self.lock = threading.Lock()
+        self.calls = defaultdict(lambda: deque(maxlen=window))   # (latency_ms, ok)
+        self.unique = defaultdict(lambda: deque(maxlen=window))  # unique merged results per search
+        self.merge_times = deque(maxlen=window)                   # (merge time ms, number of input results)
+        self.last_call = {}                                       # engine -> monotonic time of its last call
+
+    def record_call(self, engine_name: str, latency_ms: float, ok: bool):
+        with self.lock:
+            self.calls[engine_name].append((latency_ms, ok))
+            self.last_call[engine_name] = time.monotonic()
+
+    def record_merge(self, engine_names, merged_results: dict, merge_time_ms: float = None, input_size: int = 0):
+        """Counts, for every engine that answered, the merged results no other engine returned."""
+        unique = dict.fromkeys(engine_names, 0)
+        for engine, _ in merged_results.values():
+            if isinstance(engine, str) and engine in unique:
+                unique[engine] += 1
+        with self.lock:
+            for engine_name, count in unique.items():
+                self.unique[engine_name].append(count)
+            if merge_time_ms is not None:
+                self.merge_times.append((merge_time_ms, input_size))
+
+    def failing(self, engine_name: str, recent: int = 5, retry_after: float = 30) -> bool:
+        """
+        True while the engine is circuit-broken: its last `recent` calls all failed and the last one
+        is less than retry_after seconds old. After that the engine is tried again.
+        """
+        with self.lock:
+            calls = self.calls.get(engine_name)
+            if not calls or len(calls) < recent:
+                return False
+            if time.monotonic() - self.last_call.get(engine_name, 0) >= retry_after:
+                return False
+            return not any(ok for _, ok in list(calls)[-recent:])
+
+    @staticmethod
+    def _percentile(values: list, p: float):
+        if not values:
+            return None
+        values = sorted(values)
+        index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+        return values[index]
+
+    def summary(self, engine_name: str) -> dict:
+        with self.lock:
+            calls = list(self.calls.get(engine_name, ()))
+            unique = list(self.unique.get(engine_name, ()))
+        latencies = [latency for latency, _ in calls]
+        errors = sum(1 for _, ok in calls if not ok)
+        return {
+            "samples": len(calls),
+            "error_rate": round(errors / len(calls), 3) if calls else None,
+            "p50_ms": self._percentile(latencies, 50),
+            "p90_ms": self._percentile(latencies, 90),
+            "p99_ms": self._percentile(latencies, 99),
+            "avg_unique_results": round(sum(unique) / len(unique), 2) if unique else None,
+        }
+
+    def stats(self) -> dict:
+        with self.lock:
+            names = set(self.calls) | set(self.unique)
+        return {name: self.summary(name) for name in sorted(names)}
+
+    def merge_stats(self) -> dict:
+        with self.lock:
+            merge_times = list(self.merge_times)
+        times = [merge_time for merge_time, _ in merge_times]
+        return {
+            "samples": len(times),
+            "p50_ms": self._percentile(times, 50),
+            "p90_ms": self._percentile(times, 90),
+            "max_ms": max(times) if times else None,
+            "avg_input_results": round(sum(size for _, size in merge_times) / len(merge_times), 1) if merge_times else None,
+        }
+
+    def select_engines(self, candidates: list, budget_ms: float, coverage: float = 0.9, min_samples: int = 5,
+                       explore: float = 0.05, stale_after: float = 600) -> list:
+        """
+        Picks the smallest set of engines expected to answer within budget_ms (by their p90 latency)
+        that still brings `coverage` of the expected unique results. Engines with too few samples,
+        and engines in the budget whose unique results were never measured (no merged searches yet),
+        are always included. Engines left out are still used in `explore` of the searches, and once
+        their last call is older than stale_after seconds, so they are measured again.
+        """
+        unknown = []
+        in_budget = []
+        left_out = []
+        fastest = None
+        now = time.monotonic()
+        for engine_name in candidates:
+            summary = self.summary(engine_name)
+            if summary["samples"] < min_samples:
+                unknown.append(engine_name)
+                continue
+            if fastest is None or summary["p50_ms"] < fastest[1]:
+                fastest = (engine_name, summary["p50_ms"])
+            if summary["p90_ms"] <= budget_ms and summary["error_rate"] < 1:
+                if summary["avg_unique_results"] is None:
+                    unknown.append(engine_name)
+                    continue
+                value = summary["avg_unique_results"] * (1 - summary["error_rate"])
+                in_budget.append((value, engine_name))
+            else:
+                left_out.append(engine_name)
+
+        in_budget.sort(reverse=True)
+        total = sum(value for value, _ in in_budget)
+        selected = []
+        kept = 0
+        for value, engine_name in in_budget:
+            if selected and kept >= total * coverage:
+                break
+            selected.append(engine_name)
+            kept += value
+        left_out += [engine_name for _, engine_name in in_budget if engine_name not in selected]
+
+        selected += unknown
+        for engine_name in left_out:
+            with self.lock:
+                last_call = self.last_call.get(engine_name, 0)
+            if now - last_call > stale_after or random.random() < explore:
+                selected.append(engine_name)
+        if not selected and fastest:
+            # Nothing fits the budget, the fastest engine is the best we can do
+            selected.append(fastest[0])
+
+        # Keep the category order
+        return [engine_name for engine_name in candidates if engine_name in selected]
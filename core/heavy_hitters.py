@@ -0,0 +1,45 @@
+import threading
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitters sketch: tracks the most frequent keys with at most `capacity` counters.
+    A new key replaces the smallest counter and inherits its count, so frequent keys are never missed.
+    Each key keeps a payload (the latest one offered), which lets callers replay it.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.counters = {}  # key -> [count, overestimation, payload]
+        self.lock = threading.Lock()
+
+    def offer(self, key, payload=None):
+        with self.lock:
+            counter = self.counters.get(key)
+            if counter:
+                counter[0] += 1
+                counter[2] = payload
+                return
+            if len(self.counters) < self.capacity:
+                self.counters[key] = [1, 0, payload]
+                return
+            # The linear scan only happens for keys that are not tracked yet
+            smallest = min(self.counters, key=lambda k: self.counters[k][0])
+            count = self.counters.pop(smallest)[0]
+            self.counters[key] = [count + 1, count, payload]
+
+    def top(self, n: int) -> list:
+        """Returns up to n (key, estimated count, payload) tuples, most frequent first."""
+        with self.lock:
+            items = sorted(self.counters.items(), key=lambda item: item[1][0], reverse=True)[:n]
+            return [(key, count, payload) for key, (count, _, payload) in items]
+
+    def decay(self, factor: float = 0.5):
+        """Scales every count down so the ranking follows recent traffic. Keys that reach zero are dropped."""
+        with self.lock:
+            for key in list(self.counters):
+                counter = self.counters[key]
+                counter[0] = int(counter[0] * factor)
+                counter[1] = int(counter[1] * factor)
+                if counter[0] == 0:
+                    del self.counters[key]
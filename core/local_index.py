@@ -0,0 +1,157 @@
+import json
+import queue
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from core.search_result import SearchResult
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    engines TEXT NOT NULL,
+    seen_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_seen_at ON results(seen_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS results_fts USING fts5(title, content, content='results', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS results_ai AFTER INSERT ON results BEGIN
+    INSERT INTO results_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS results_ad AFTER DELETE ON results BEGIN
+    INSERT INTO results_fts(results_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS results_au AFTER UPDATE ON results BEGIN
+    INSERT INTO results_fts(results_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    INSERT INTO results_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+"""
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class LocalIndex:
+    """
+    SQLite FTS5 index of the merged results MOA has served.
+
+    Results are queued by submit() and written by a background thread, so searches never wait
+    for the index. Rows older than max_age_days are pruned, and the oldest rows go once there
+    are more than max_rows.
+    """
+
+    def __init__(self, path: str, max_rows: int = 200000, max_age_days: float = 30, queue_size: int = 1000):
+        self.path = Path(path)
+        if not self.path.is_absolute():
+            self.path = Path(__file__).parent.parent / self.path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_rows = max_rows
+        self.max_age = max_age_days * 86400
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.counters = {"written": 0, "dropped": 0, "searches": 0}
+        self.lock = threading.Lock()
+
+        # Fails early (sqlite3.OperationalError) if this SQLite build has no FTS5
+        connection = self._connect()
+        try:
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+
+        self.writer = threading.Thread(target=self._write_loop, name="local-index-writer", daemon=True)
+        self.writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=10)
+        connection.execute("PRAGMA journal_mode=WAL")
+        return connection
+
+    def submit(self, results: list):
+        """
+        Queues merged (engine, result) pairs for indexing. Never blocks, results are dropped if the
+        writer falls behind.
+        """
+        rows = []
+        now = time.time()
+        for engine, result in results:
+            engines = engine if isinstance(engine, list) else [engine]
+            rows.append((result.url, result.title, result.content or "", json.dumps([e for e in engines if e]), now))
+        if not rows:
+            return
+        try:
+            self.queue.put_nowait(rows)
+        except queue.Full:
+            with self.lock:
+                self.counters["dropped"] += len(rows)
+
+    def _write_loop(self):
+        connection = self._connect()
+        last_prune = 0.0
+        while True:
+            rows = self.queue.get()
+            # Write whatever else is waiting in the same transaction
+            while len(rows) < 5000:
+                try:
+                    rows += self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                with connection:
+                    connection.executemany(
+                        "INSERT INTO results(url, title, content, engines, seen_at) VALUES (?, ?, ?, ?, ?) "
+                        "ON CONFLICT(url) DO UPDATE SET title=excluded.title, content=excluded.content, "
+                        "engines=excluded.engines, seen_at=excluded.seen_at",
+                        rows,
+                    )
+                with self.lock:
+                    self.counters["written"] += len(rows)
+
+                if time.monotonic() - last_prune > 60:
+                    last_prune = time.monotonic()
+                    self._prune(connection)
+            except sqlite3.Error:
+                with self.lock:
+                    self.counters["dropped"] += len(rows)
+
+    def _prune(self, connection: sqlite3.Connection):
+        with connection:
+            connection.execute("DELETE FROM results WHERE seen_at < ?", (time.time() - self.max_age,))
+            count = connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            if count > self.max_rows:
+                connection.execute(
+                    "DELETE FROM results WHERE id IN (SELECT id FROM results ORDER BY seen_at LIMIT ?)",
+                    (count - self.max_rows,),
+                )
+
+    def search(self, query: str, limit: int | None = None) -> list:
+        """Returns the best matching indexed results for the query as (engine, SearchResult) pairs, like the merger."""
+        # Every word is quoted so user input can't form FTS5 syntax, bm25 ranks results matching more words first
+        tokens = TOKEN_RE.findall(query)
+        if not tokens:
+            return []
+        match = " OR ".join('"' + token.replace('"', '""') + '"' for token in tokens)
+
+        with self.lock:
+            self.counters["searches"] += 1
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                "SELECT results.url, results.title, results.content, results.engines FROM results_fts "
+                "JOIN results ON results.id = results_fts.rowid "
+                "WHERE results_fts MATCH ? ORDER BY bm25(results_fts) LIMIT ?",
+                (match, limit or 20),
+            ).fetchall()
+        finally:
+            connection.close()
+
+        results = []
+        for url, title, content, engines in rows:
+            engines = json.loads(engines)
+            results.append((engines[0] if len(engines) == 1 else engines, SearchResult(title=title, url=url, content=content)))
+        return results
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"queued": self.queue.qsize(), **self.counters}
@@ -0,0 +1,47 @@
+import json
+import threading
+from collections import OrderedDict
+
+
+class PluginCache:
+    """
+    Bounded LRU of pre-plugin outputs, keyed by plugin, plugin params and query.
+    Only plugins declared pure (output depends on nothing but the query and params) are cached.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(plugin, query: str) -> tuple:
+        params = json.dumps(plugin.get_params(), sort_keys=True, default=str)
+        return (plugin.__class__.__name__, params, query)
+
+    def __contains__(self, key) -> bool:
+        with self.lock:
+            return key in self.entries
+
+    def get(self, key):
+        """Returns (found, output)."""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return True, self.entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, output):
+        with self.lock:
+            self.entries[key] = output
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"entries": len(self.entries), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,100 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+# Plugin instances of a worker process, loaded once by _init_worker
+_worker_plugins = {}
+
+
+def _init_worker():
+    from core.plugin_loader import PluginLoader
+
+    loader = PluginLoader()
+    _worker_plugins.update({plugin.__class__.__name__: plugin for plugin in loader.plugins.values()})
+
+
+def _warm_up() -> int:
+    return os.getpid()
+
+
+def _run_plugin(plugin_name: str, args: tuple):
+    plugin = _worker_plugins.get(plugin_name)
+    if plugin is None:
+        raise RuntimeError(f"Plugin {plugin_name} is not loaded in the worker process")
+    return plugin.run(*args)
+
+
+class PluginProcessPool:
+    """
+    Persistent pool of worker processes for CPU-heavy plugins (execution: process in plugin_params.yml),
+    so they don't compete for the GIL with parsing and the event loop.
+
+    Every worker loads the plugins once when it starts, only the plugin name and its arguments
+    (query, SearchResult objects) are pickled per call. A crashed pool is replaced. A call that
+    takes longer than `timeout` seconds fails and the pool is killed and replaced, so other calls
+    running on it at that moment fail too.
+    """
+
+    def __init__(self, workers: int = 2, timeout: float = 10):
+        self.workers = workers
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.counters = {"calls": 0, "timeouts": 0, "crashes": 0, "restarts": 0}
+        # spawn: forking a process that already runs threads is unsafe
+        self.context = multiprocessing.get_context("spawn")
+        self.executor = self._start()
+
+        # Pre-warm: start every worker and load its plugins now instead of on the first search
+        for future in [self.executor.submit(_warm_up) for _ in range(self.workers)]:
+            future.result()
+
+    def _start(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(self.workers, mp_context=self.context, initializer=_init_worker)
+
+    def run(self, plugin, *args):
+        """Runs plugin.run(*args) in a worker process. Blocks, so call it from a thread."""
+        executor = self.executor
+        plugin_name = plugin.__class__.__name__
+        self._count("calls")
+        try:
+            future = executor.submit(_run_plugin, plugin_name, args)
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # A hung plugin would keep its worker forever, so the whole pool is killed and replaced
+            self._count("timeouts")
+            self._restart(executor, kill=True)
+            raise TimeoutError(f"Plugin {plugin_name} timed out after {self.timeout} seconds")
+        except BrokenProcessPool:
+            # Calls that were running on a pool killed after another call's timeout end up here too,
+            # only a pool that still needs replacing counts as a crash
+            if self._restart(executor):
+                self._count("crashes")
+                raise RuntimeError(f"Worker process crashed while running plugin {plugin_name}")
+            raise RuntimeError(f"Worker pool was replaced while running plugin {plugin_name}")
+
+    def _count(self, name: str):
+        with self.lock:
+            self.counters[name] += 1
+
+    def _restart(self, broken: ProcessPoolExecutor, kill: bool = False) -> bool:
+        """Replaces the broken pool. False if another thread has replaced it already."""
+        with self.lock:
+            if self.executor is not broken:
+                return False
+            if kill:
+                # ProcessPoolExecutor has no public way to stop running calls (before Python 3.14)
+                for process in list((broken._processes or {}).values()):
+                    process.kill()
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.executor = self._start()
+            self.counters["restarts"] += 1
+            return True
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"workers": self.workers, **self.counters}
@@ -0,0 +1,189 @@
+import itertools
+from http.cookiejar import DefaultCookiePolicy
+import threading
+import time
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class RejectCookies(DefaultCookiePolicy):
+    """Cookie policy that never stores or returns a cookie."""
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+
+def get_proxy_config(proxy: dict) -> dict:
+    """
+    Converts proxy configuration from YAML into a format usable by the 'requests' library.
+    Example input:
+        {
+            "http": "http://127.0.0.1:8080",
+            "https": "http://127.0.0.1:8080"
+        }
+    """
+    if not isinstance(proxy, dict):
+        raise TypeError("Proxy config must be a dictionary.")
+
+    output_proxy = {}
+
+    for key in ("http", "https"):
+        value = proxy.get(key)
+        if value:
+            if not (value.startswith("http://") or value.startswith("https://")):
+                raise ValueError(f"{key} proxy must start with http:// or https://")
+            output_proxy[key] = value
+
+    return output_proxy if output_proxy else None
+
+
+def get_proxy_pool_config(proxys) -> list:
+    """
+    Converts the 'proxys' setting into proxy pool entries. It can be a single http/https pair
+    or a list of them, each optionally limited to some engines:
+        [
+            {"http": "http://127.0.0.1:8080", "https": "http://127.0.0.1:8080", "engines": ["google"]},
+            {"http": "http://127.0.0.2:8080", "https": "http://127.0.0.2:8080"}
+        ]
+    """
+    if not isinstance(proxys, list):
+        proxys = [proxys]
+
+    entries = []
+    for item in proxys:
+        proxy_config = get_proxy_config(item)
+        if proxy_config:
+            entries.append({"proxies": proxy_config, "engines": item.get("engines")})
+    return entries
+
+
+class ProxyEntry:
+    """One proxy of the pool, with its own kept-alive connections and health counters."""
+
+    def __init__(self, name: str, proxies: dict, engines=None, connections: int = 10):
+        self.name = name
+        self.proxies = proxies
+        self.engines = set(engines) if engines else None
+
+        # Each proxy gets its own session so connections to it (and through it) are reused
+        self.session = requests.Session()
+        # Shared by every user's searches: cookies set by engines must not be kept and sent with later queries.
+        # Cookies passed with a request (the engines' consent cookies) are still sent.
+        self.session.cookies.set_policy(RejectCookies())
+        adapter = HTTPAdapter(pool_connections=connections, pool_maxsize=connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.captchas = 0
+        self.consecutive_failures = 0
+        self.score = 1.0
+        self.total_latency = 0.0
+        self.rested_until = 0.0
+
+    def serves(self, engine_name: str) -> bool:
+        return self.engines is None or engine_name in self.engines
+
+    def stats(self, now: float) -> dict:
+        return {
+            "engines": sorted(self.engines) if self.engines else "all",
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "captchas": self.captchas,
+            "score": round(self.score, 3),
+            "avg_latency_ms": round(self.total_latency / self.requests * 1000, 1) if self.requests else None,
+            "resting_for": round(self.rested_until - now, 1) if self.rested_until > now else 0,
+        }
+
+
+def proxy_name(proxies: dict) -> str:
+    """A readable name for a proxy without its credentials."""
+    url = proxies.get("https") or proxies.get("http")
+    if not url:
+        return "direct"
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.hostname}" + (f":{parsed.port}" if parsed.port else "")
+
+
+class ProxyPool:
+    """
+    Selects a proxy for each engine request and tracks how every proxy behaves.
+
+    Proxies that fail max_failures times in a row are rested for rest_time seconds,
+    CAPTCHA/429 responses rest them for captcha_rest_time. With no proxies configured
+    the pool holds a single direct entry, so connection reuse still applies.
+    """
+
+    def __init__(self, entries: list, strategy: str = "round_robin", max_failures: int = 3,
+                 rest_time: float = 120, captcha_rest_time: float = 600, connections: int = 10):
+        self.strategy = strategy
+        self.max_failures = max_failures
+        self.rest_time = rest_time
+        self.captcha_rest_time = captcha_rest_time
+        self.lock = threading.Lock()
+        self.counter = itertools.count()
+
+        self.entries = []
+        for entry in entries or [{"proxies": {}}]:
+            name = proxy_name(entry["proxies"])
+            if any(e.name == name for e in self.entries):
+                name = f"{name}#{len(self.entries)}"
+            self.entries.append(ProxyEntry(name, entry["proxies"], entry.get("engines"), connections))
+
+    def acquire(self, engine_name: str) -> ProxyEntry:
+        with self.lock:
+            now = time.monotonic()
+            candidates = [e for e in self.entries if e.serves(engine_name)] or self.entries
+            healthy = [e for e in candidates if e.rested_until <= now]
+
+            if not healthy:
+                # Everything is resting, use the proxy that comes back first
+                entry = min(candidates, key=lambda e: e.rested_until)
+            elif self.strategy == "least_loaded":
+                entry = min(healthy, key=lambda e: (e.in_flight, -e.score))
+            else:
+                entry = healthy[next(self.counter) % len(healthy)]
+
+            entry.in_flight += 1
+            return entry
+
+    def available(self, engine_name: str) -> bool:
+        """True if at least one proxy serving the engine is not resting."""
+        with self.lock:
+            now = time.monotonic()
+            candidates = [e for e in self.entries if e.serves(engine_name)] or self.entries
+            return any(e.rested_until <= now for e in candidates)
+
+    def release(self, entry: ProxyEntry, error: str | None, latency: float, blocked: bool = False):
+        """Reports the outcome of a request. blocked marks CAPTCHA pages and 429 responses, which rest the proxy longer."""
+        with self.lock:
+            entry.in_flight -= 1
+            entry.requests += 1
+            entry.total_latency += latency
+
+            if not error:
+                entry.consecutive_failures = 0
+                entry.score = entry.score * 0.9 + 0.1
+                return
+
+            entry.failures += 1
+            entry.consecutive_failures += 1
+            entry.score = entry.score * 0.9
+            if blocked:
+                entry.captchas += 1
+                entry.score = entry.score * 0.5
+                entry.rested_until = time.monotonic() + self.captcha_rest_time
+            elif entry.consecutive_failures >= self.max_failures:
+                entry.rested_until = time.monotonic() + self.rest_time
+
+    def stats(self) -> dict:
+        with self.lock:
+            now = time.monotonic()
+            return {entry.name: entry.stats(now) for entry in self.entries}
@@ -0,0 +1,38 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket per engine. acquire() blocks until the engine may be called, so each engine gets at most
+    `rate` calls per second on average (bursts of up to `burst`). Rates are set per engine, 0 means no limit.
+    """
+
+    def __init__(self, rates: dict | None = None, default_rate: float = 0, burst: float = 1):
+        self.rates = rates or {}
+        self.default_rate = default_rate
+        self.burst = burst
+        self.buckets = {}  # engine -> [tokens, last update]
+        self.lock = threading.Lock()
+        self.waited = {}  # engine -> seconds spent waiting
+
+    def acquire(self, engine_name: str):
+        rate = self.rates.get(engine_name, self.default_rate)
+        if not rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            bucket = self.buckets.setdefault(engine_name, [self.burst, now])
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            # The token is taken right away (going negative), so waiting callers are served in order
+            bucket[0] -= 1
+            delay = -bucket[0] / rate if bucket[0] < 0 else 0
+            if delay:
+                self.waited[engine_name] = self.waited.get(engine_name, 0) + delay
+        if delay:
+            time.sleep(delay)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {name: round(waited, 2) for name, waited in self.waited.items()}
@@ -0,0 +1,115 @@
+import asyncio
+import time
+from core.result_cache import search_key
+from core.search_modes.engine_call import run_engine
+
+
+class RefreshAhead:
+    """
+    Keeps the cached engine results of the most popular queries fresh, so they are always answered from memory.
+
+    Every `interval` seconds the top_n queries of the heavy-hitters sketch are checked, and engine results
+    that go stale within refresh_before seconds are fetched again in the background. Upstream calls are
+    limited to max_refreshes_per_minute, and engines that are failing (error rate above max_error_rate,
+    or every proxy serving them is resting) are skipped.
+    """
+
+    def __init__(self, sketch, result_cache, loader, logger, proxy_pool=None, engine_stats=None, top_n: int = 100,
+                 refresh_before: float = 30, interval: float = 5, max_refreshes_per_minute: int = 60,
+                 max_error_rate: float = 0.5, max_concurrency: int = 4, decay_interval: float = 600):
+        self.sketch = sketch
+        self.result_cache = result_cache
+        self.loader = loader
+        self.logger = logger
+        self.proxy_pool = proxy_pool
+        self.engine_stats = engine_stats
+        self.top_n = top_n
+        self.refresh_before = refresh_before
+        self.interval = interval
+        self.rate = max_refreshes_per_minute / 60
+        self.max_error_rate = max_error_rate
+        self.max_concurrency = max_concurrency
+        self.decay_interval = decay_interval
+        self.budget = 0.0
+        self.counters = {"cycles": 0, "refreshed": 0, "failed": 0, "skipped_unhealthy": 0, "skipped_budget": 0}
+
+    @staticmethod
+    def query_key(selected_engines: list, search_params: dict) -> str:
+        return search_key({**search_params, "engines": sorted(selected_engines)})
+
+    def record(self, selected_engines: list, search_params: dict):
+        """Counts a search towards the popularity of its query."""
+        self.sketch.offer(self.query_key(selected_engines, search_params), (list(selected_engines), dict(search_params)))
+
+    def healthy(self, engine_name: str) -> bool:
+        if self.engine_stats:
+            error_rate = self.engine_stats.summary(engine_name)["error_rate"]
+            if error_rate is not None and error_rate > self.max_error_rate:
+                return False
+        return not self.proxy_pool or self.proxy_pool.available(engine_name)
+
+    def due(self) -> list:
+        """Returns the (engine name, search params) pairs of popular queries whose results are about to go stale."""
+        pending = []
+        seen = set()
+        for _, _, (selected_engines, search_params) in self.sketch.top(self.top_n):
+            key = search_key(search_params)
+            for engine_name in selected_engines:
+                expires_in = self.result_cache.expires_in(engine_name, key)
+                # Results that were never cached (or were evicted) are left to the next real search
+                if expires_in is None or expires_in > self.refresh_before or (engine_name, key) in seen:
+                    continue
+                seen.add((engine_name, key))
+                if not self.healthy(engine_name):
+                    self.counters["skipped_unhealthy"] += 1
+                    continue
+                pending.append((engine_name, search_params))
+        return pending
+
+    async def run(self):
+        last_cycle = time.monotonic()
+        last_decay = last_cycle
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            # Unused budget carries over for one interval at most
+            self.budget = min(self.budget + (now - last_cycle) * self.rate, max(1.0, self.rate * self.interval) * 2)
+            last_cycle = now
+            if now - last_decay > self.decay_interval:
+                self.sketch.decay()
+                last_decay = now
+
+            self.counters["cycles"] += 1
+            tasks = []
+            for engine_name, search_params in self.due():
+                if self.budget < 1:
+                    self.counters["skipped_budget"] += 1
+                    continue
+                self.budget -= 1
+                tasks.append(self.refresh(engine_name, search_params, semaphore))
+            if tasks:
+                await asyncio.gather(*tasks)
+
+    async def refresh(self, engine_name: str, search_params: dict, semaphore: asyncio.Semaphore):
+        engine_instance = self.loader.get_engine(engine_name)
+        if not engine_instance:
+            return
+        async with semaphore:
+            try:
+                output = await asyncio.to_thread(
+                    run_engine, engine_name, engine_instance, search_params, self.proxy_pool, self.engine_stats, self.result_cache, True)
+            except Exception as e:
+                output = {"error": str(e)}
+        if isinstance(output, dict) and output.get("error"):
+            self.counters["failed"] += 1
+            self.logger.debug("Refresh of %s for '%s' failed: %s", engine_name, search_params.get("query"), output["error"])
+        else:
+            self.counters["refreshed"] += 1
+
+    def stats(self) -> dict:
+        return {
+            "top_queries": [{"query": params.get("query"), "engines": engines, "count": count}
+                            for _, count, (engines, params) in self.sketch.top(10)],
+            **self.counters,
+        }
@@ -0,0 +1,57 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+def search_key(search_params: dict) -> str:
+    """Stable key for a set of search parameters. The query is case-folded and its whitespace collapsed."""
+    query = search_params.get("query")
+    if isinstance(query, str):
+        search_params = {**search_params, "query": " ".join(query.split()).casefold()}
+    return json.dumps(search_params, sort_keys=True, default=str)
+
+
+class ResultCache:
+    """
+    In-memory cache of successful engine outputs, keyed by engine and search parameters.
+    Entries are fresh for `ttl` seconds, the least recently used go once there are more than max_entries.
+    """
+
+    def __init__(self, ttl: float = 300, max_entries: int = 20000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # (engine, key) -> (expires, output)
+        self.lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "refreshes": 0}
+
+    def get(self, engine_name: str, key: str):
+        with self.lock:
+            entry = self.entries.get((engine_name, key))
+            if entry and entry[0] > time.monotonic():
+                self.entries.move_to_end((engine_name, key))
+                self.counters["hits"] += 1
+                # Callers slice "results" in place, so each gets its own top-level dict
+                return dict(entry[1])
+            self.counters["misses"] += 1
+            return None
+
+    def put(self, engine_name: str, key: str, output, refresh: bool = False):
+        if not isinstance(output, dict) or output.get("error"):
+            return
+        with self.lock:
+            self.entries[(engine_name, key)] = (time.monotonic() + self.ttl, dict(output))
+            self.entries.move_to_end((engine_name, key))
+            self.counters["refreshes" if refresh else "stores"] += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def expires_in(self, engine_name: str, key: str) -> float | None:
+        """Seconds until the entry goes stale (negative if it already is), None if there is no entry."""
+        with self.lock:
+            entry = self.entries.get((engine_name, key))
+            return entry[0] - time.monotonic() if entry else None
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"entries": len(self.entries), "ttl": self.ttl, **self.counters}
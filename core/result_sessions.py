@@ -0,0 +1,107 @@
+import asyncio
+import secrets
+import time
+from collections import OrderedDict
+
+
+class ResultSession:
+    """A merged result set, as (engine, result) pairs, that later requests can page through with a cursor."""
+
+    def __init__(self, session_id: str, search_params: dict, selected_engines: list, limit, results: list, pre_plugin_outputs: dict):
+        self.id = session_id
+        self.search_params = search_params
+        self.selected_engines = selected_engines
+        self.limit = limit
+        self.results = results
+        self.seen_urls = {result.url for _, result in results}
+        self.pre_plugin_outputs = pre_plugin_outputs
+        self.page = search_params.get("page", 1)  # Last engine page merged into the set
+        self.exhausted = not results
+        self.last_access = time.monotonic()
+        self.lock = asyncio.Lock()  # Only one request fetches more engine pages at a time
+
+    def add(self, results: list) -> int:
+        """Appends results whose URL is not in the set yet, returns how many were added."""
+        added = 0
+        for engine, result in results:
+            if result.url not in self.seen_urls:
+                self.seen_urls.add(result.url)
+                self.results.append((engine, result))
+                added += 1
+        return added
+
+
+class ResultSessionStore:
+    """
+    Keeps merged result sessions in memory for `ttl` seconds after their last use.
+    The total number of stored results is capped by max_results, the least recently used sessions go first.
+    """
+
+    def __init__(self, ttl: float = 300, max_results: int = 100000):
+        self.ttl = ttl
+        self.max_results = max_results
+        self.sessions = OrderedDict()
+        self.total_results = 0
+        self.counters = {"created": 0, "hits": 0, "expired": 0, "evicted": 0, "truncated": 0, "engine_fetches": 0}
+
+    @staticmethod
+    def make_cursor(session_id: str, offset: int) -> str:
+        return f"{session_id}.{offset}"
+
+    @staticmethod
+    def parse_cursor(cursor: str):
+        """Returns (session id, offset) or None for a malformed cursor."""
+        session_id, _, offset = cursor.rpartition(".")
+        if not session_id or not offset.isdigit():
+            return None
+        return session_id, int(offset)
+
+    def create(self, search_params: dict, selected_engines: list, limit, results: list, pre_plugin_outputs: dict) -> ResultSession:
+        session = ResultSession(secrets.token_urlsafe(12), dict(search_params), list(selected_engines), limit, results, pre_plugin_outputs)
+        self.sessions[session.id] = session
+        self.total_results += len(session.results)
+        self.counters["created"] += 1
+        self._evict()
+        return session
+
+    def get(self, session_id: str) -> ResultSession | None:
+        self._evict()
+        session = self.sessions.get(session_id)
+        if session:
+            session.last_access = time.monotonic()
+            self.sessions.move_to_end(session_id)
+            self.counters["hits"] += 1
+        return session
+
+    def extend(self, session: ResultSession, results: list) -> int:
+        added = session.add(results)
+        if session.id in self.sessions:
+            self.total_results += added
+        self.counters["engine_fetches"] += 1
+        self._evict()
+        return added
+
+    def _evict(self):
+        now = time.monotonic()
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if now - session.last_access > self.ttl:
+                self.counters["expired"] += 1
+            elif self.total_results > self.max_results and len(self.sessions) > 1:
+                self.counters["evicted"] += 1
+            else:
+                break
+            del self.sessions[session_id]
+            self.total_results -= len(session.results)
+
+        # Only one session is left if the limit is still exceeded. It is cut down to max_results and not extended any more.
+        excess = self.total_results - self.max_results
+        if excess > 0:
+            session = next(iter(self.sessions.values()))
+            del session.results[len(session.results) - excess:]
+            session.exhausted = True
+            self.total_results = self.max_results
+            self.counters["truncated"] += 1
+
+    def stats(self) -> dict:
+        return {"sessions": len(self.sessions), "results": self.total_results, "max_results": self.max_results, **self.counters}
@@ -0,0 +1,80 @@
+import asyncio
+import time
+from functools import partial
+from core.base_engine import is_blocked
+from core.result_cache import search_key
+
+
+def run_engine(engine_name, engine_instance, search_params, proxy_pool=None, engine_stats=None, result_cache=None, refresh=False, rate_limiter=None, coalescer=None):
+    """
+    Runs a single engine search. Shared by every search mode.
+    Fresh cached outputs are returned without an upstream call (refresh=True always goes upstream and updates the cache).
+    With a coalescer, identical calls in flight at the same time share one upstream call.
+    With a rate limiter, the call waits until the engine may be called again.
+    With a proxy pool, the engine is given the selected proxy and its session, and the outcome is reported back to the pool.
+    The latency and outcome also feed the rolling engine statistics.
+    """
+    key = search_key(search_params) if result_cache is not None or coalescer is not None else None
+    if result_cache is not None and not refresh:
+        cached = result_cache.get(engine_name, key)
+        if cached is not None:
+            return cached
+
+    call = partial(_call_engine, engine_name, engine_instance, search_params, proxy_pool, engine_stats, result_cache, key, refresh, rate_limiter)
+    if coalescer is None:
+        return call()
+    return _own_copy(coalescer.run((engine_name, key), call))
+
+
+async def run_engine_async(engine_name, engine_instance, search_params, proxy_pool=None, engine_stats=None, result_cache=None, coalescer=None):
+    """
+    run_engine for coroutines. With a coalescer, a cancelled caller stops waiting right away,
+    and the upstream call is dropped if no other caller waits for it and it hasn't started.
+    """
+    if coalescer is None:
+        return await asyncio.to_thread(run_engine, engine_name, engine_instance, search_params, proxy_pool, engine_stats, result_cache)
+
+    key = search_key(search_params)
+    if result_cache is not None:
+        cached = result_cache.get(engine_name, key)
+        if cached is not None:
+            return cached
+
+    call = partial(_call_engine, engine_name, engine_instance, search_params, proxy_pool, engine_stats, result_cache, key, False, None)
+    return _own_copy(await coalescer.run_async((engine_name, key), call))
+
+
+def _own_copy(output):
+    # Callers slice "results" in place, so every caller of a shared call gets its own top-level dict
+    return dict(output) if isinstance(output, dict) else output
+
+
+def _call_engine(engine_name, engine_instance, search_params, proxy_pool, engine_stats, result_cache, key, refresh, rate_limiter):
+    if rate_limiter:
+        rate_limiter.acquire(engine_name)
+
+    entry = proxy_pool.acquire(engine_name) if proxy_pool else None
+    if entry:
+        params = {**search_params, "proxy": entry.proxies, "session": entry.session}
+    else:
+        params = {"proxy": {}, **search_params}
+
+    started = time.monotonic()
+    try:
+        output = engine_instance.search(**params)
+    except Exception as e:
+        _report(engine_name, entry, str(e) or e.__class__.__name__, time.monotonic() - started, proxy_pool, engine_stats, is_blocked(e))
+        raise
+
+    error = output.get("error") if isinstance(output, dict) else None
+    _report(engine_name, entry, error, time.monotonic() - started, proxy_pool, engine_stats, engine_instance.was_blocked())
+    if result_cache is not None:
+        result_cache.put(engine_name, key, output, refresh)
+    return output
+
+
+def _report(engine_name, entry, error, latency, proxy_pool, engine_stats, blocked=False):
+    if entry:
+        proxy_pool.release(entry, error, latency, blocked)
+    if engine_stats:
+        engine_stats.record_call(engine_name, latency * 1000, not error)
@@ -0,0 +1,89 @@
+import hashlib
+import re
+from collections import defaultdict
+from functools import lru_cache
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+# Every bit of a token hash gets its own 16-bit lane in a big integer, so summing the lane integers
+# of all tokens counts every bit position at once without a Python loop per bit.
+LANE_BITS = 16
+MAX_TOKENS = 16000
+LANE_ONES = sum(1 << (i * LANE_BITS) for i in range(64))
+BIT_CHARS = bytes.maketrans(b"\x00\x01", b"01")
+
+
+@lru_cache(maxsize=65536)
+def _token_lanes(token: str) -> int:
+    digest = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big")
+    lanes = 0
+    for i in range(64):
+        if digest >> i & 1:
+            lanes |= 1 << (i * LANE_BITS)
+    return lanes
+
+
+def simhash(text: str) -> tuple:
+    """Returns (64-bit SimHash of the words of text, number of words)."""
+    tokens = TOKEN_RE.findall(text.lower())[:MAX_TOKENS]
+    if not tokens:
+        return 0, 0
+
+    # A bit is set when more than half of the tokens have it: 2 * count - n - 1 >= 0.
+    # Offsetting every lane by 0x8000 turns that into the top bit of the lane.
+    n = len(tokens)
+    lanes = sum(map(_token_lanes, tokens)) * 2 + LANE_ONES * (0x8000 - n - 1)
+    top_bits = ((lanes >> (LANE_BITS - 1)) & LANE_ONES).to_bytes(64 * LANE_BITS // 8, "little")
+    bits = top_bits[::LANE_BITS // 8].translate(BIT_CHARS)
+    return int(bits[::-1], 2), n
+
+
+def find_near_duplicates(results: list, max_distance: int = 6, bands: int = 7, min_tokens: int = 4, key=None) -> list:
+    """
+    Groups results whose title + content SimHashes differ in at most max_distance bits.
+
+    Fingerprints are split into `bands` bands and only results sharing a band are compared.
+    With bands > max_distance every near-duplicate pair shares at least one band, so nothing
+    is missed while the number of comparisons stays far below n^2.
+    key: optional function returning the SearchResult of an item, for lists that hold more than results.
+    Returns the groups as lists of results, in order of first appearance.
+    """
+    bands = max(bands, max_distance + 1)
+    width = 64 // bands
+    mask = (1 << width) - 1
+
+    parent = list(range(len(results)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    fingerprints = {}
+    buckets = defaultdict(list)
+    for i, item in enumerate(results):
+        result = key(item) if key else item
+        fingerprint, length = simhash(f"{result.title} {result.content}")
+        if length < min_tokens:
+            continue
+        fingerprints[i] = fingerprint
+
+        compared = set()
+        for band in range(bands):
+            bucket = buckets[(band, (fingerprint >> (band * width)) & mask)]
+            for j in bucket:
+                if j in compared:
+                    continue
+                compared.add(j)
+                if (fingerprint ^ fingerprints[j]).bit_count() <= max_distance:
+                    root_i, root_j = find(i), find(j)
+                    if root_i != root_j:
+                        parent[max(root_i, root_j)] = min(root_i, root_j)
+            bucket.append(i)
+
+    groups = defaultdict(list)
+    for i, result in enumerate(results):
+        groups[find(i)].append(result)
+    return list(groups.values())
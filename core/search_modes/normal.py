@@ -1,5 +1,7 @@
 # add selected_post_plugins
 from concurrent.futures import ThreadPoolExecutor
+from core.search_modes.engine_call import run_engine
+from core.search_modes.plugin_call import run_pre_plugin, runs_inline
 
 def normal_search(
     max_threads,
@@ -10,6 +12,13 @@ def normal_search(
     selected_pre_plugins,
     q,
     limit,
+    proxy_pool=None,
+    plugin_cache=None,
+    engine_stats=None,
+    plugin_pool=None,
+    result_cache=None,
+    rate_limiter=None,
+    coalescer=None,
     ):
     results = {}
     pre_plugin_outputs = {} # Pre plugins also work in parallel with engines.
@@ -22,18 +31,28 @@ def normal_search(
                 logger.error("Engine %s not found!", engine_name)
                 continue
 
-            futures[executor.submit(engine_instance.search, **search_params)] = ("engine", engine_name)
+            futures[executor.submit(run_engine, engine_name, engine_instance, search_params, proxy_pool, engine_stats, result_cache, rate_limiter=rate_limiter, coalescer=coalescer)] = ("engine", engine_name)
 
         for plugin in selected_pre_plugins:
-            futures[executor.submit(plugin.run, q)] = ("pre_plugin", plugin.__class__.__name__)
+            plugin_name = plugin.__class__.__name__
+            if runs_inline(plugin, q, plugin_cache):
+                try:
+                    pre_plugin_outputs[plugin_name] = run_pre_plugin(plugin, q, plugin_cache, plugin_pool)
+                except Exception as e:
+                    logger.error("Pre_plugin %s failed: %s", plugin_name, str(e))
+                    pre_plugin_outputs[plugin_name] = {"error": str(e)}
+                continue
+
+            futures[executor.submit(run_pre_plugin, plugin, q, plugin_cache, plugin_pool)] = ("pre_plugin", plugin_name)
 
         for future in futures:
             ftype, name = futures[future]
             try:
                 output = future.result()
                 if ftype == "engine":
-                    if limit and isinstance(output, dict) and "results" in output and isinstance(output["results"], list):
-                        output["results"] = output["results"][:limit]
+                    if isinstance(output, dict) and isinstance(output.get("results"), list):
+                        if limit:
+                            output["results"] = output["results"][:limit]
                     results[name] = output
                 elif ftype == "pre_plugin":
                     pre_plugin_outputs[name] = output
@@ -0,0 +1,27 @@
+def call_plugin(plugin, args, plugin_pool=None):
+    """Runs plugin.run(*args), in the process pool for plugins declared with execution: process."""
+    if plugin_pool is not None and plugin.get_execution() == "process":
+        return plugin_pool.run(plugin, *args)
+    return plugin.run(*args)
+
+
+def run_pre_plugin(plugin, q, plugin_cache=None, plugin_pool=None):
+    """Runs a pre-plugin, serving pure plugins from the cache when possible."""
+    if plugin_cache is None or not plugin.is_pure():
+        return call_plugin(plugin, (q,), plugin_pool)
+
+    key = plugin_cache.key(plugin, q)
+    found, output = plugin_cache.get(key)
+    if found:
+        return output
+
+    output = call_plugin(plugin, (q,), plugin_pool)
+    plugin_cache.put(key, output)
+    return output
+
+
+def runs_inline(plugin, q, plugin_cache=None) -> bool:
+    """Cached outputs and cheap pure plugins are run in place instead of taking a worker thread."""
+    if plugin_cache is None or not plugin.is_pure():
+        return False
+    return plugin.is_inline() or plugin_cache.key(plugin, q) in plugin_cache
@@ -1,79 +1,57 @@
 from collections import defaultdict
-
-
-def results_merger(out_results):
-    flattened_result = {}
-    index = 0
-
-    # Combine results of all engines
+from core.search_result import SearchResult
+from core.search_modes.near_duplicates import find_near_duplicates
+
+
+def combine_results(group):
+    """
+    Merges (engine, result) pairs describing the same page: keeps the result with the best title
+    (longest) and the engines of all of them.
+    """
+    if len(group) == 1:
+        return group[0]
+
+    best_engine, best_result = max(group, key=lambda pair: len(pair[1].title))
+
+    # Combine engine names from all results, starting with the engine of the best result
+    engine_names = []
+    for engine, _ in [(best_engine, best_result)] + group:
+        for name in engine if isinstance(engine, list) else [engine]:
+            if isinstance(name, str) and name not in engine_names:
+                engine_names.append(name)
+
+    return (engine_names[0] if len(engine_names) == 1 else engine_names), best_result
+
+
+def results_merger(out_results, near_duplicates=None):
+    """
+    Merges the results of all engines into one list, removing duplicate URLs.
+    near_duplicates: optional settings for find_near_duplicates (max_distance, bands, min_tokens)
+    to also merge near-duplicate pages (mirrors, AMP or mobile pages, syndicated copies).
+    Returns {index: (engine name or names, SearchResult)}. The engines' results are not copied
+    or changed, they may be shared with the result cache.
+    """
+    # Combine results of all engines and skip results without title or URL.
+    # Engines that still return plain dicts get them converted.
+    flattened_result = []
     for engine_name, engine_data in out_results.items():
         if "results" in engine_data and isinstance(engine_data["results"], list):
             for result in engine_data["results"]:
                 if isinstance(result, dict):
-                    result_with_engine = result.copy()
-                    result_with_engine["engine"] = engine_name
-                    flattened_result[index] = result_with_engine
-                    index += 1
-
-    # Remove results without title or URL
-    keys_to_delete = []
-    for key, result in flattened_result.items():
-        if not result.get("title") or not result.get("url"):
-            keys_to_delete.append(key)
-    for key in keys_to_delete:
-        del flattened_result[key]
-
-    # Reset keys to be in order
-    results_without_blanks = {i: v for i, v in enumerate(flattened_result.values())}
+                    result = SearchResult.from_dict(result)
+                if isinstance(result, SearchResult) and result.title and result.url:
+                    flattened_result.append((result.engine or engine_name, result))
 
     # Group by URL
     duplicates = defaultdict(list)
-    for key, result in results_without_blanks.items():
-        url = result.get("url")
-        if url:
-            duplicates[url].append(key)
+    for engine, result in flattened_result:
+        duplicates[result.url].append((engine, result))
 
-    new_flattened_result = {}
+    merged = [combine_results(group) for group in duplicates.values()]
 
-    for url, keys in duplicates.items():
-        if len(keys) == 1:
-            # Only one result for this URL
-            key = keys[0]
-            new_flattened_result[key] = results_without_blanks[key]
-        else:
-            # Multiple results: pick best title (longest)
-            titles = {key: results_without_blanks[key].get("title", "") for key in keys}
-            max_key = max(titles, key=lambda k: len(titles[k]))
-            best_result = results_without_blanks[max_key].copy()
-
-            # Combine engine names from all results
-            engine_names = set()
-            # Engine of best result
-            orig_engine = best_result.get("engine")
-            if isinstance(orig_engine, list):
-                engine_names.update(orig_engine)
-            elif isinstance(orig_engine, str):
-                engine_names.add(orig_engine)
-
-            # Engines of the rest
-            for key in keys:
-                if key == max_key:
-                    continue
-                other_engine = results_without_blanks[key].get("engine")
-                if isinstance(other_engine, list):
-                    engine_names.update(other_engine)
-                elif isinstance(other_engine, str):
-                    engine_names.add(other_engine)
-
-            # Set combined engine(s)
-            if len(engine_names) == 1:
-                best_result["engine"] = next(iter(engine_names))
-            else:
-                best_result["engine"] = list(engine_names)
-
-            new_flattened_result[max_key] = best_result
+    if near_duplicates:
+        groups = find_near_duplicates(merged, key=lambda pair: pair[1], **near_duplicates)
+        merged = [combine_results(group) for group in groups]
 
     # Reindex the final result
-    sorted_results = {i: v for i, v in enumerate(new_flattened_result.values())}
-
-    return sorted_results
+    return {i: pair for i, pair in enumerate(merged)}
@@ -1,8 +1,12 @@
 import asyncio
+import contextlib
 import json
 from fastapi.responses import StreamingResponse
+from core.search_result import json_default
+from core.search_modes.engine_call import run_engine_async
+from core.search_modes.plugin_call import call_plugin, run_pre_plugin, runs_inline
 
-async def stream_search(
+async def stream_events(
     selected_engines,
     loader,
     search_params,
@@ -10,66 +14,152 @@ async def stream_search(
     selected_pre_plugins,
     selected_post_plugins,
     q,
+    proxy_pool=None,
+    plugin_cache=None,
+    engine_stats=None,
+    announce_engines=False,
+    plugin_pool=None,
+    result_cache=None,
+    coalescer=None,
     ):
-    async def event_stream():
-        queue = asyncio.Queue()
-
-        counter = {"value": 0}
-        async def run_tasks():
-            tasks = []
-
-            for eng_name in selected_engines:
-                engine_instance = loader.get_engine(eng_name)
-                if not engine_instance:
-                    await queue.put({"type": "engine_result", "name": eng_name, "error": "Engine not found"})
-                    continue
-
-                async def run_engine(name, instance):
-                    try:
-                        result = await asyncio.to_thread(
-                            instance.search, **search_params)
-                        if isinstance(result, dict) and "results" in result:
-                            if limit:
-                                result["results"] = result["results"][:limit]
-                            counter["value"] += len(result["results"])
-                        await queue.put({"type": "engine_result", "name": name, "result": result})
-                    except Exception as e:
-                        await queue.put({"type": "engine_result", "name": name, "error": str(e)})
-
-                tasks.append(run_engine(eng_name, engine_instance))
-
-            for pre_plugin in selected_pre_plugins:
-                plugin_name = pre_plugin.__class__.__name__
-
-                async def run_pre_plugin(instance, name):
-                    try:
-                        result = await asyncio.to_thread(instance.run, q)
-                        await queue.put({"type": "pre_plugin_result", "name": name, "result": result})
-                    except Exception as e:
-                        await queue.put({"type": "pre_plugin_result", "name": name, "error": str(e)})
-
-                tasks.append(run_pre_plugin(pre_plugin, plugin_name))
-
-            await asyncio.gather(*tasks)
-
-            for post_plugin in selected_post_plugins:
-                plugin_name = post_plugin.__class__.__name__
+    """
+    Yields the events of a streamed search as dicts, each engine and plugin result as soon as it is ready.
+    Closing the generator cancels the search: engine calls that haven't started are dropped and post plugins are skipped.
+    """
+    queue = asyncio.Queue()
+
+    counter = {"value": 0}
+    async def run_tasks():
+        tasks = []
+
+        # Engines picked by the adaptive ("fast") selection are reported first
+        if announce_engines:
+            await queue.put({"type": "selected_engines", "data": list(selected_engines)})
+
+        for eng_name in selected_engines:
+            engine_instance = loader.get_engine(eng_name)
+            if not engine_instance:
+                await queue.put({"type": "engine_result", "name": eng_name, "error": "Engine not found"})
+                continue
+
+            async def stream_engine(name, instance):
                 try:
-                    result = await asyncio.to_thread(post_plugin.run, q)
-                    await queue.put({"type": "post_plugin_result", "name": plugin_name, "result": result})
+                    result = await run_engine_async(
+                        name, instance, search_params, proxy_pool, engine_stats, result_cache, coalescer)
+                    if isinstance(result, dict) and "results" in result:
+                        if limit:
+                            result["results"] = result["results"][:limit]
+                        counter["value"] += len(result["results"])
+                    await queue.put({"type": "engine_result", "name": name, "result": result})
                 except Exception as e:
-                    await queue.put({"type": "post_plugin_result", "name": plugin_name, "error": str(e)})
+                    await queue.put({"type": "engine_result", "name": name, "error": str(e)})
+
+            tasks.append(stream_engine(eng_name, engine_instance))
 
-            await queue.put({"type": "number_of_results", "data": counter["value"]})
-            await queue.put({"type": "done", "data": "[DONE]"})
+        for pre_plugin in selected_pre_plugins:
+            plugin_name = pre_plugin.__class__.__name__
 
-        asyncio.create_task(run_tasks())
+            async def stream_pre_plugin(instance, name):
+                try:
+                    if runs_inline(instance, q, plugin_cache):
+                        result = run_pre_plugin(instance, q, plugin_cache, plugin_pool)
+                    else:
+                        result = await asyncio.to_thread(run_pre_plugin, instance, q, plugin_cache, plugin_pool)
+                    await queue.put({"type": "pre_plugin_result", "name": name, "result": result})
+                except Exception as e:
+                    await queue.put({"type": "pre_plugin_result", "name": name, "error": str(e)})
 
+            tasks.append(stream_pre_plugin(pre_plugin, plugin_name))
+
+        await asyncio.gather(*tasks)
+
+        for post_plugin in selected_post_plugins:
+            plugin_name = post_plugin.__class__.__name__
+            try:
+                result = await asyncio.to_thread(call_plugin, post_plugin, (q,), plugin_pool)
+                await queue.put({"type": "post_plugin_result", "name": plugin_name, "result": result})
+            except Exception as e:
+                await queue.put({"type": "post_plugin_result", "name": plugin_name, "error": str(e)})
+
+        await queue.put({"type": "number_of_results", "data": counter["value"]})
+        await queue.put({"type": "done", "data": "[DONE]"})
+
+    task = asyncio.create_task(run_tasks())
+    try:
         while True:
             data = await queue.get()
+            yield data
             if data.get("type") == "done":
-                yield json.dumps(data).encode() + b"\n"
                 break
-            yield json.dumps(data).encode() + b"\n"
+    finally:
+        task.cancel()
+
+
+def format_event(data, event_id=None, sse=False, encode_result=None) -> bytes:
+    """Serializes an event as a JSON line, or as a Server-Sent Event with sse."""
+    if event_id and not sse:
+        data = {"event_id": event_id, **data}
+    body = json.dumps(data, default=encode_result or json_default)
+    if not sse:
+        return body.encode() + b"\n"
+    return (f"id: {event_id}\n" if event_id else "").encode() + f"data: {body}\n\n".encode()
+
+
+def replay_response(stream, replay, after_seq=0, sse=False, encode_result=None):
+    """Sends the events of a replay stream after after_seq, every event with its "<stream id>:<seq>" id."""
+    async def event_stream():
+        async for seq, data in stream.follow(after_seq):
+            yield format_event(data, replay.make_event_id(stream.id, seq), sse, encode_result)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream" if sse else "application/json")
+
+
+async def stream_search(
+    selected_engines,
+    loader,
+    search_params,
+    limit,
+    selected_pre_plugins,
+    selected_post_plugins,
+    q,
+    proxy_pool=None,
+    plugin_cache=None,
+    engine_stats=None,
+    announce_engines=False,
+    plugin_pool=None,
+    encode_result=None,
+    result_cache=None,
+    coalescer=None,
+    sse=False,
+    replay=None,
+    on_done=None,
+    ):
+    events = stream_events(
+        selected_engines=selected_engines,
+        loader=loader,
+        search_params=search_params,
+        limit=limit,
+        selected_pre_plugins=selected_pre_plugins,
+        selected_post_plugins=selected_post_plugins,
+        q=q,
+        proxy_pool=proxy_pool,
+        plugin_cache=plugin_cache,
+        engine_stats=engine_stats,
+        announce_engines=announce_engines,
+        plugin_pool=plugin_pool,
+        result_cache=result_cache,
+        coalescer=coalescer,
+    )
+
+    # With a replay store the search runs to the end even if the client goes away, so it can resume with Last-Event-ID
+    if replay:
+        stream = replay.start(events, on_done)
+        return replay_response(stream, replay, 0, sse, encode_result)
+
+    async def event_stream():
+        # A client that goes away closes the events, which cancels the search
+        async with contextlib.aclosing(events):
+            async for data in events:
+                yield format_event(data, sse=sse, encode_result=encode_result)
 
-    return StreamingResponse(event_stream(), media_type="application/json")
+    return StreamingResponse(event_stream(), media_type="text/event-stream" if sse else "application/json")
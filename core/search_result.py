@@ -0,0 +1,89 @@
+class SearchResult:
+    """
+    A single search result.
+
+    Engines build these directly and the merger, plugins and encoders share the
+    same objects. Conversion to plain dicts only happens at the API boundary
+    through to_dict() / to_builtin().
+    """
+
+    __slots__ = ("title", "url", "content", "thumbnail", "engine")
+
+    def __init__(self, title: str = "", url: str = "", content: str = "", thumbnail: str | None = None, engine=None):
+        self.title = title
+        self.url = url
+        self.content = content
+        self.thumbnail = thumbnail
+        self.engine = engine
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SearchResult":
+        """Builds a result from the old dict format. Keys other than the slot fields are dropped."""
+        return cls(
+            title=data.get("title") or "",
+            url=data.get("url") or "",
+            content=data.get("content") or "",
+            thumbnail=data.get("thumbnail"),
+            engine=data.get("engine"),
+        )
+
+    def get(self, key: str, default=None):
+        # dict-style access so plugins written against the old dict results keep working
+        if key not in self.__slots__:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def __getitem__(self, key: str):
+        if key not in self.__slots__ or getattr(self, key) is None:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key) -> bool:
+        return key in self.__slots__ and getattr(self, key) is not None
+
+    def __setitem__(self, key: str, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def to_dict(self) -> dict:
+        data = {
+            "title": self.title,
+            "url": self.url,
+            "content": self.content,
+        }
+        if self.thumbnail is not None:
+            data["thumbnail"] = self.thumbnail
+        if self.engine is not None:
+            data["engine"] = self.engine
+        return data
+
+    def __repr__(self):
+        return f"SearchResult(title={self.title!r}, url={self.url!r}, engine={self.engine!r})"
+
+
+
+def merged_to_dict(engine, result: SearchResult) -> dict:
+    """Plain dict of a merged (engine, result) pair, naming the engine or engines that returned it."""
+    data = result.to_dict()
+    data["engine"] = engine
+    return data
+
+
+def to_builtin(data):
+    """Recursively converts SearchResult objects inside API output into plain dicts."""
+    if isinstance(data, SearchResult):
+        return data.to_dict()
+    if isinstance(data, dict):
+        return {key: to_builtin(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [to_builtin(value) for value in data]
+    return data
+
+
+def json_default(obj):
+    """'default' hook for json.dumps, so stream events can be encoded without a conversion pass."""
+    if isinstance(obj, SearchResult):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class Coalescer:
+    """
+    Singleflight for engine calls: concurrent calls with the same key share one upstream call
+    and all get its result or its exception.
+
+    The first caller runs the call in its own thread (coroutines in the default executor, like
+    asyncio.to_thread), later callers wait for it. A blocking caller that finds the call not
+    started yet runs it itself, so it never waits on a coroutine's call that is queued behind the
+    very threads that are waiting for it. When the last waiter goes away before the call has
+    started, the call is dropped.
+    """
+
+    def __init__(self):
+        self.inflight = {}  # key -> [future, waiters]
+        # Reentrant: cancelling a future runs its done callback (_forget) right away, under the lock
+        self.lock = threading.RLock()
+        self.counters = {"calls": 0, "upstream": 0, "coalesced": 0, "taken_over": 0, "abandoned": 0}
+
+    def _join(self, key):
+        """Returns (future, True if the caller has to run the call)."""
+        with self.lock:
+            self.counters["calls"] += 1
+            flight = self.inflight.get(key)
+            if flight:
+                flight[1] += 1
+                self.counters["coalesced"] += 1
+                return flight[0], False
+            future = Future()
+            self.inflight[key] = [future, 1]
+            self.counters["upstream"] += 1
+        future.add_done_callback(lambda _: self._forget(key, future))
+        return future, True
+
+    def _start(self, future) -> bool:
+        """Claims the call. False if it already runs or is done, or every waiter left before it started."""
+        with self.lock:
+            if future.running() or future.done():
+                return False
+            return future.set_running_or_notify_cancel()
+
+    def _execute(self, future, fn) -> bool:
+        """Runs fn for the future unless someone else already claimed it. True if it ran here."""
+        if not self._start(future):
+            return False
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        return True
+
+    def _forget(self, key, future):
+        with self.lock:
+            flight = self.inflight.get(key)
+            if flight and flight[0] is future:
+                del self.inflight[key]
+
+    def _leave(self, key, future):
+        with self.lock:
+            flight = self.inflight.get(key)
+            if not flight or flight[0] is not future:
+                return
+            flight[1] -= 1
+            # A call that already runs is kept, so new callers can still join it
+            if flight[1] == 0 and future.cancel():
+                self.inflight.pop(key, None)
+                self.counters["abandoned"] += 1
+
+    def run(self, key, fn):
+        """Returns fn() or the result of the identical call that is already in flight. Blocks."""
+        future, leader = self._join(key)
+        if self._execute(future, fn) and not leader:
+            with self.lock:
+                self.counters["taken_over"] += 1
+        try:
+            return future.result()
+        finally:
+            self._leave(key, future)
+
+    async def run_async(self, key, fn):
+        """Like run, for coroutines. Cancelling the caller only removes it from the waiters."""
+        future, leader = self._join(key)
+        if leader:
+            asyncio.get_running_loop().run_in_executor(None, self._execute, future, fn)
+        try:
+            return await asyncio.shield(asyncio.wrap_future(future))
+        finally:
+            self._leave(key, future)
+
+    def stats(self) -> dict:
+        with self.lock:
+            counters = dict(self.counters)
+            in_flight = len(self.inflight)
+        ratio = round(counters["coalesced"] / counters["calls"], 3) if counters["calls"] else None
+        return {"in_flight": in_flight, "coalescing_ratio": ratio, **counters}
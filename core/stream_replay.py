@@ -0,0 +1,129 @@
+import asyncio
+import secrets
+import time
+from collections import OrderedDict, deque
+
+
+class ReplayStream:
+    """The events of one streamed search, numbered from 1, kept so a client that reconnects can resume."""
+
+    def __init__(self, stream_id: str, max_events: int):
+        self.id = stream_id
+        self.events = deque(maxlen=max_events)  # (seq, event), only the last max_events are kept
+        self.last_seq = 0
+        self.done = False
+        self.finished_at = None
+        self.changed = asyncio.Event()
+
+    def append(self, event: dict):
+        self.last_seq += 1
+        self.events.append((self.last_seq, event))
+        self._notify()
+
+    def finish(self):
+        self.done = True
+        self.finished_at = time.monotonic()
+        self._notify()
+
+    def _notify(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def can_resume(self, after_seq: int) -> bool:
+        """False if events after after_seq were already dropped from the buffer (or never existed)."""
+        first_seq = self.events[0][0] if self.events else self.last_seq + 1
+        return first_seq - 1 <= after_seq <= self.last_seq
+
+    async def follow(self, after_seq: int = 0):
+        """Yields (seq, event) for every event after after_seq, waiting for new ones until the search is done."""
+        while True:
+            changed = self.changed
+            for seq, event in list(self.events):
+                if seq > after_seq:
+                    after_seq = seq
+                    yield seq, event
+            if self.done and after_seq >= self.last_seq:
+                return
+            if after_seq >= self.last_seq:
+                await changed.wait()
+
+
+class StreamReplayStore:
+    """
+    Runs streamed searches independently of their clients and keeps their events for `ttl` seconds
+    after the search finished, so a dropped client can resume without new upstream calls.
+    At most max_streams finished streams are kept, the oldest go first, and at most max_running
+    searches are buffered at the same time (check has_capacity() before start()).
+    """
+
+    def __init__(self, ttl: float = 60, max_streams: int = 1000, max_events: int = 1000, max_running: int = 100):
+        self.ttl = ttl
+        self.max_streams = max_streams
+        self.max_events = max_events
+        self.max_running = max_running
+        self.streams = OrderedDict()
+        self.running = 0
+        self.counters = {"started": 0, "unbuffered": 0, "resumed": 0, "replayed_events": 0, "expired": 0}
+
+    @staticmethod
+    def make_event_id(stream_id: str, seq: int) -> str:
+        return f"{stream_id}:{seq}"
+
+    @staticmethod
+    def parse_event_id(event_id: str):
+        """Returns (stream id, sequence number) or None for a malformed event id."""
+        stream_id, _, seq = (event_id or "").strip().rpartition(":")
+        if not stream_id or not seq.isdigit():
+            return None
+        return stream_id, int(seq)
+
+    def has_capacity(self) -> bool:
+        """False once max_running searches are buffered. Such searches are streamed without replay instead."""
+        if self.running < self.max_running:
+            return True
+        self.counters["unbuffered"] += 1
+        return False
+
+    def start(self, events, on_done=None) -> ReplayStream:
+        """Consumes the events generator in a background task. on_done is called once the search has finished."""
+        self._evict()
+        stream = ReplayStream(secrets.token_urlsafe(12), self.max_events)
+        self.streams[stream.id] = stream
+        self.counters["started"] += 1
+        self.running += 1
+
+        async def produce():
+            try:
+                async for event in events:
+                    stream.append(event)
+            finally:
+                self.running -= 1
+                stream.finish()
+                if on_done:
+                    on_done()
+
+        stream.task = asyncio.create_task(produce())
+        return stream
+
+    def resume(self, stream_id: str, after_seq: int) -> ReplayStream | None:
+        """Returns the stream if the client can continue after after_seq, None if it has expired or the events are gone."""
+        self._evict()
+        stream = self.streams.get(stream_id)
+        if not stream or not stream.can_resume(after_seq):
+            return None
+        self.counters["resumed"] += 1
+        self.counters["replayed_events"] += sum(1 for seq, _ in stream.events if seq > after_seq)
+        return stream
+
+    def _evict(self):
+        now = time.monotonic()
+        finished = [stream for stream in self.streams.values() if stream.done]
+        excess = len(finished) - self.max_streams
+        for stream in finished:
+            if excess > 0 or now - stream.finished_at > self.ttl:
+                del self.streams[stream.id]
+                excess -= 1
+                self.counters["expired"] += 1
+
+    def stats(self) -> dict:
+        return {"streams": len(self.streams), "running": self.running, **self.counters}
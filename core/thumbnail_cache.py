@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import urlencode, urlparse
+import requests
+
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class ThumbnailCache:
+    """
+    Size-bounded on-disk LRU of thumbnails fetched through MOA's proxies.
+
+    Every image is stored as <key> (body) and <key>.json (content type, validators, expiry).
+    Stale images are revalidated with If-None-Match / If-Modified-Since, bodies are streamed
+    to disk in chunks, and concurrent requests for the same image share one upstream fetch.
+    Thumbnail URLs are signed, so the endpoint can't be used as an open proxy.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024, max_image_bytes: int = 5 * 1024 * 1024,
+                 default_ttl: int = 86400, timeout: float = 10, secret: str | None = None):
+        self.directory = Path(directory)
+        if not self.directory.is_absolute():
+            self.directory = Path(__file__).parent.parent / self.directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_image_bytes = max_image_bytes
+        self.default_ttl = default_ttl
+        self.timeout = timeout
+        self.secret = (secret or self._stored_secret()).encode()
+
+        self.lock = threading.Lock()
+        self.index = OrderedDict()  # key -> size, least recently used first
+        self.total_bytes = 0
+        self.inflight = {}
+        self.counters = {"hits": 0, "misses": 0, "revalidated": 0, "coalesced": 0, "evicted": 0}
+        self._load_index()
+
+    def _stored_secret(self) -> str:
+        """
+        Signing key kept in the cache directory, so every worker process and restart signs alike.
+        Created atomically by the first process: the key is written to a temporary file and linked in place.
+        """
+        path = self.directory / "secret.key"
+        if not path.exists():
+            temporary = self.directory / f"secret.key.{os.getpid()}.tmp"
+            temporary.write_text(secrets.token_hex(32))
+            try:
+                os.link(temporary, path)
+            except FileExistsError:
+                pass
+            finally:
+                temporary.unlink()
+        return path.read_text().strip()
+
+    def _load_index(self):
+        files = [path for path in self.directory.iterdir() if path.is_file() and path.suffix == "" and path.with_suffix(".json").exists()]
+        for path in sorted(files, key=lambda p: p.stat().st_mtime):
+            size = path.stat().st_size
+            self.index[path.name] = size
+            self.total_bytes += size
+        self._evict()
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def sign(self, url: str) -> str:
+        return hmac.new(self.secret, url.encode(), hashlib.sha256).hexdigest()[:32]
+
+    def verify(self, url: str, sig: str) -> bool:
+        return hmac.compare_digest(self.sign(url), sig or "")
+
+    def proxy_url(self, url: str) -> str:
+        return "/thumbnail?" + urlencode({"url": url, "sig": self.sign(url)})
+
+    def rewrite(self, result: dict) -> dict:
+        """Points the thumbnail of a result dict at the /thumbnail endpoint."""
+        thumbnail = result.get("thumbnail")
+        if thumbnail and urlparse(thumbnail).scheme in ("http", "https"):
+            result["thumbnail"] = self.proxy_url(thumbnail)
+        return result
+
+    def etag(self, url: str, meta: dict) -> str:
+        """ETag for clients. Based on the image content, so it survives revalidations that find the image unchanged."""
+        validator = meta.get("digest") or meta.get("etag") or meta.get("last_modified") or url
+        return '"' + hashlib.sha256(validator.encode()).hexdigest()[:32] + '"'
+
+    def _read_meta(self, key: str) -> dict | None:
+        try:
+            with open(self.directory / f"{key}.json", "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    async def get(self, url: str, proxy_pool) -> tuple:
+        """Returns (path of the cached body, metadata), fetching or revalidating the image if needed."""
+        key = self.key(url)
+        meta = self._read_meta(key) if key in self.index else None
+        if meta and meta["expires"] > time.time():
+            self._touch(key)
+            self.counters["hits"] += 1
+            return self.directory / key, meta
+
+        task = self.inflight.get(key)
+        if task:
+            self.counters["coalesced"] += 1
+        else:
+            self.counters["misses"] += 1
+            task = asyncio.ensure_future(asyncio.to_thread(self._fetch, url, key, meta, proxy_pool))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        # Shielded: a client going away must not cancel the fetch other requests wait for
+        meta = await asyncio.shield(task)
+        return self.directory / key, meta
+
+    def _fetch(self, url: str, key: str, cached_meta: dict | None, proxy_pool) -> dict:
+        headers = {"User-Agent": "Mozilla/5.0", "Accept": "image/*"}
+        if cached_meta:
+            if cached_meta.get("etag"):
+                headers["If-None-Match"] = cached_meta["etag"]
+            if cached_meta.get("last_modified"):
+                headers["If-Modified-Since"] = cached_meta["last_modified"]
+
+        entry = proxy_pool.acquire("thumbnail")
+        started = time.monotonic()
+        error = None
+        try:
+            with entry.session.get(url, headers=headers, proxies=entry.proxies, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304 and cached_meta:
+                    meta = {**cached_meta, "expires": time.time() + self._ttl(response)}
+                    self._write_meta(key, meta)
+                    self._touch(key)
+                    self.counters["revalidated"] += 1
+                    return meta
+
+                response.raise_for_status()
+                content_type = response.headers.get("Content-Type", "")
+                if not content_type.startswith("image/"):
+                    raise ValueError(f"Not an image: {content_type or 'no content type'}")
+
+                # Streamed to a temporary file, large bodies are never held in memory
+                tmp_path = self.directory / f"{key}.{threading.get_ident()}.tmp"
+                size = 0
+                digest = hashlib.sha256()
+                try:
+                    with open(tmp_path, "wb") as f:
+                        for chunk in response.iter_content(chunk_size=65536):
+                            size += len(chunk)
+                            if size > self.max_image_bytes:
+                                raise ValueError(f"Image exceeds {self.max_image_bytes} bytes")
+                            digest.update(chunk)
+                            f.write(chunk)
+                    os.replace(tmp_path, self.directory / key)
+                finally:
+                    if tmp_path.exists():
+                        tmp_path.unlink()
+
+                meta = {
+                    "content_type": content_type,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "digest": digest.hexdigest(),
+                    "expires": time.time() + self._ttl(response),
+                }
+                self._write_meta(key, meta)
+                self._add(key, size)
+                return meta
+        except (requests.ConnectionError, requests.Timeout) as e:
+            # Only transport errors say something about the proxy. Missing images, wrong content types
+            # and oversized images are the image host's problem and must not rest a proxy the engines use.
+            error = str(e) or e.__class__.__name__
+            raise
+        finally:
+            proxy_pool.release(entry, error, time.monotonic() - started)
+
+    def _ttl(self, response) -> int:
+        match = MAX_AGE_RE.search(response.headers.get("Cache-Control", ""))
+        return int(match.group(1)) if match else self.default_ttl
+
+    def _write_meta(self, key: str, meta: dict):
+        tmp_path = self.directory / f"{key}.json.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.directory / f"{key}.json")
+
+    def _touch(self, key: str):
+        with self.lock:
+            if key in self.index:
+                self.index.move_to_end(key)
+
+    def _add(self, key: str, size: int):
+        with self.lock:
+            self.total_bytes += size - self.index.pop(key, 0)
+            self.index[key] = size
+        self._evict()
+
+    def _evict(self):
+        with self.lock:
+            while self.total_bytes > self.max_bytes and len(self.index) > 1:
+                key, size = self.index.popitem(last=False)
+                self.total_bytes -= size
+                self.counters["evicted"] += 1
+                for path in (self.directory / key, self.directory / f"{key}.json"):
+                    try:
+                        path.unlink()
+                    except OSError:
+                        pass
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"images": len(self.index), "bytes": self.total_bytes, "max_bytes": self.max_bytes, **self.counters}
@@ -0,0 +1,36 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def warm_up(loader, engine_names, proxy_pool, logger, timeout: float = 5, max_threads: int = 10) -> dict:
+    """
+    Pre-resolves and pre-connects to the hosts of the given engines, through every proxy of
+    the pool that serves the engine, so the connections are waiting in the proxies' sessions.
+    Returns the outcome for each engine and host.
+    """
+    jobs = []
+    for engine_name in engine_names:
+        engine_instance = loader.get_engine(engine_name)
+        if not engine_instance:
+            continue
+        for host in engine_instance.get_hosts():
+            for entry in proxy_pool.entries:
+                if entry.serves(engine_name):
+                    jobs.append((engine_name, host, entry))
+
+    def connect(engine_name, host, entry):
+        started = time.monotonic()
+        try:
+            # Any status is fine, the point is the DNS lookup (cached) and the TCP/TLS handshake
+            entry.session.head(f"https://{host}/", proxies=entry.proxies, timeout=timeout, allow_redirects=False)
+            return f"ok ({(time.monotonic() - started) * 1000:.0f} ms)"
+        except Exception as e:
+            logger.warning("Warm-up of %s (%s) via %s failed: %s", host, engine_name, entry.name, str(e))
+            return f"error: {e}"
+
+    report = {}
+    with ThreadPoolExecutor(max_threads) as executor:
+        futures = {executor.submit(connect, *job): job for job in jobs}
+        for future, (engine_name, host, entry) in futures.items():
+            report.setdefault(engine_name, {})[f"{host} via {entry.name}"] = future.result()
+    return report
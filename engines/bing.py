@@ -3,7 +3,8 @@ import re
 from urllib.parse import urlencode
 from lxml import html
 import requests
-from core.base_engine import BaseEngine
+from core.base_engine import BaseEngine, CaptchaError
+from core.search_result import SearchResult
 
 class BingEngine(BaseEngine):
     def __init__(self):
@@ -17,9 +18,12 @@ class BingEngine(BaseEngine):
             "CN": "cn.bing.com",
         }
 
+    def get_hosts(self) -> list:
+        return [self.BING_DOMAINS["US"]]
+
     def detect_bing_sorry(self, response):
         if "captcha" in response.url:
-            raise Exception("Bing CAPTCHA detected")
+            raise CaptchaError("Bing CAPTCHA detected")
 
     def get_bing_info(self, locale="en-US", country="US"):
         lang_code = locale.split("-")[0]
@@ -35,7 +39,7 @@ class BingEngine(BaseEngine):
             "cookies": {"CONSENT": "YES+"},
         }
 
-    def search(self, query: str, proxy, timeout: int = 10, page: int = 1, time_range: str = None, safesearch: int = 0, locale="en-US", country="US", **kwargs) -> dict:
+    def search(self, query: str, proxy, timeout: int = 10, page: int = 1, time_range: str = None, safesearch: int = 0, locale="en-US", country="US", session=None, **kwargs) -> dict:
         try:
             bing_info = self.get_bing_info(locale, country)
             offset = (page - 1) * 10
@@ -53,18 +57,20 @@ class BingEngine(BaseEngine):
             params["safe"] = safesearch_mapping.get(safesearch, "off")
 
             url = f"https://{bing_info['subdomain']}/search?{urlencode(params)}"
-            response = requests.get(
+            # Closing the streamed response hands its connection back to the session, on errors too
+            with (session or requests).get(
                 url,
                 headers=bing_info["headers"],
                 cookies=bing_info["cookies"],
                 timeout=timeout,
-                proxies=proxy
-            )
-
-            response.raise_for_status()
-            self.detect_bing_sorry(response)
+                proxies=proxy,
+                stream=True
+            ) as response:
+                response.raise_for_status()
+                self.detect_bing_sorry(response)
+                text = self.read_text(response, b'class="b_algo"', kwargs.get("num_results"))
 
-            dom = html.fromstring(response.text)
+            dom = html.fromstring(text)
             results = []
 
             for result in dom.xpath('//li[contains(@class, "b_algo")]'):
@@ -73,13 +79,13 @@ class BingEngine(BaseEngine):
                 content = result.xpath('.//p//text()')
 
                 if title and url and content:
-                    results.append({
-                        "title": " ".join(title).strip(),
-                        "url": url[0],
-                        "content": " ".join(content).strip(),
-                    })
+                    results.append(SearchResult(
+                        title=" ".join(title).strip(),
+                        url=url[0],
+                        content=" ".join(content).strip(),
+                    ))
 
             return {"results": results}
         
         except Exception as e:
-            return {"error": str(e)}
+            return self.error_result(e)
@@ -2,6 +2,7 @@ from urllib.parse import urlencode, urlparse
 from lxml import html
 import requests
 from core.base_engine import BaseEngine
+from core.search_result import SearchResult
 from dateutil import parser
 
 class BraveEngine(BaseEngine):
@@ -27,6 +28,9 @@ class BraveEngine(BaseEngine):
             2: 'strict'
         }
 
+    def get_hosts(self) -> list:
+        return [urlparse(self.base_url).hostname]
+
     def _get_brave_config(self, category, locale, country):
         return {
             "headers": {
@@ -51,8 +55,8 @@ class BraveEngine(BaseEngine):
         return result[0] if result else default
 
 
-    def _parse_results(self, response, category):
-        dom = html.fromstring(response.text)
+    def _parse_results(self, text, category):
+        dom = html.fromstring(text)
         results = []
 
         if category == 'news':
@@ -65,12 +69,12 @@ class BraveEngine(BaseEngine):
                 if not url or not urlparse(url).netloc:
                     continue
 
-                item = {
-                    'title': title,
-                    'url': url,
-                    'content': content,
-                    'thumbnail': thumbnail
-                }
+                item = SearchResult(
+                    title=title,
+                    url=url,
+                    content=content,
+                    thumbnail=thumbnail
+                )
                 results.append(item)
 
         else:  # Default web search
@@ -82,11 +86,11 @@ class BraveEngine(BaseEngine):
                 if not url or not urlparse(url).netloc:
                     continue
 
-                item = {
-                    'url': url,
-                    'title': title,
-                    'content': content
-                }
+                item = SearchResult(
+                    url=url,
+                    title=title,
+                    content=content
+                )
                 results.append(item)
 
         return results
@@ -94,7 +98,7 @@ class BraveEngine(BaseEngine):
     def search(self, query: str, proxy, timeout: int = 10, page: int = 1,
                 category: str = 'search', time_range: str = None,
                 safesearch: int = 0, locale: str = 'en-US',
-                country: str = 'US',
+                country: str = 'US', session=None,
                 **kwargs) -> dict:
         
         try:
@@ -118,17 +122,21 @@ class BraveEngine(BaseEngine):
             
             url = f"{self.base_url}{self.category_map[category]}?{urlencode(params)}"
             
-            response = requests.get(
+            # Closing the streamed response hands its connection back to the session, on errors too
+            stop_marker = b'data-type="news"' if category == 'news' else b'class="snippet '
+            with (session or requests).get(
                 url,
                 headers=config['headers'],
                 cookies=config['cookies'],
                 timeout=timeout,
-                proxies=proxy
-            )
-            response.raise_for_status()
-            
+                proxies=proxy,
+                stream=True
+            ) as response:
+                response.raise_for_status()
+                text = self.read_text(response, stop_marker, kwargs.get('num_results'))
+
             return {
-                "results": self._parse_results(response, category),
+                "results": self._parse_results(text, category),
                 "metadata": {
                     "page": page,
                     "category": category,
@@ -138,7 +146,7 @@ class BraveEngine(BaseEngine):
             
         except Exception as e:
             return {
-                "error": str(e),
+                **self.error_result(e),
                 "metadata": {
                     "status": "failed"
                 }
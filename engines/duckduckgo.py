@@ -1,7 +1,8 @@
 from core.base_engine import BaseEngine
+from core.search_result import SearchResult
 import requests
 import re
-from urllib.parse import urlencode, quote_plus
+from urllib.parse import urlencode, quote_plus, urlparse
 from lxml import html
 
 
@@ -12,7 +13,10 @@ class DuckDuckGoEngine(BaseEngine):
         self.time_range_dict = {'day': 'd', 'week': 'w', 'month': 'm', 'year': 'y'}
         self.base_url = "https://html.duckduckgo.com/html"
 
-    def search(self, query: str, proxy, timeout: int = 10 , page: int = 1, time_range: str = None, safesearch: int = 0, **kwargs) -> dict:
+    def get_hosts(self) -> list:
+        return [urlparse(self.base_url).hostname]
+
+    def search(self, query: str, proxy, timeout: int = 10 , page: int = 1, time_range: str = None, safesearch: int = 0, session=None, **kwargs) -> dict:
         params = {
             "page": page,
             "safesearch": safesearch,
@@ -32,16 +36,19 @@ class DuckDuckGoEngine(BaseEngine):
                 "s": (params["page"] - 1) * 30
             }
 
-            response = requests.post(
+            # Closing the streamed response hands its connection back to the session, on errors too
+            with (session or requests).post(
                 self.base_url,
                 data=data,
                 headers={"User-Agent": "Mozilla/5.0"},
                 timeout=self.config.get("timeout", timeout),
-                proxies=proxy
-            )
-            response.raise_for_status()
+                proxies=proxy,
+                stream=True
+            ) as response:
+                response.raise_for_status()
+                text = self.read_text(response, b"web-result", params.get("num_results"))
 
-            dom = html.fromstring(response.text)
+            dom = html.fromstring(text)
             results = []
 
             for result in dom.xpath('//div[contains(@class, "web-result")]'):
@@ -50,13 +57,13 @@ class DuckDuckGoEngine(BaseEngine):
                 content = result.xpath('.//a[contains(@class, "result__snippet")]//text()')
 
                 if title and url and content:
-                    results.append({
-                        "title": " ".join(title).strip(),
-                        "url": url[0].split("//duckduckgo.com/?q=")[-1],
-                        "content": " ".join(content).strip()
-                    })
+                    results.append(SearchResult(
+                        title=" ".join(title).strip(),
+                        url=url[0].split("//duckduckgo.com/?q=")[-1],
+                        content=" ".join(content).strip()
+                    ))
 
             return {"results": results}
 
         except Exception as e:
-            return {"error": str(e)}
+            return self.error_result(e)
@@ -6,7 +6,8 @@ import requests
 import random
 import string
 import time
-from core.base_engine import BaseEngine
+from core.base_engine import BaseEngine, CaptchaError
+from core.search_result import SearchResult
 
 
 class GoogleEngine(BaseEngine):
@@ -42,9 +43,12 @@ class GoogleEngine(BaseEngine):
 
         return ",".join([arc_id, use_ac, _fmt])
 
+    def get_hosts(self) -> list:
+        return [self.GOOGLE_DOMAINS["US"]]
+
     def detect_google_sorry(self, response):
         if "sorry.google.com" in response.url or "/sorry" in response.url:
-            raise Exception("Google CAPTCHA detected")
+            raise CaptchaError("Google CAPTCHA detected")
 
     def get_google_info(self, locale="en-US", country="US"):
         lang_code = locale.split("-")[0]
@@ -61,7 +65,7 @@ class GoogleEngine(BaseEngine):
             "cookies": {"CONSENT": "YES+"},
         }
 
-    def search(self, query: str, proxy, timeout: int = 10 , page: int = 1, time_range: str = None, safesearch: int = 0, locale="en-US", country="US", **kwargs) -> dict:
+    def search(self, query: str, proxy, timeout: int = 10 , page: int = 1, time_range: str = None, safesearch: int = 0, locale="en-US", country="US", session=None, **kwargs) -> dict:
         try:
             google_info = self.get_google_info(locale, country)
             offset = (page - 1) * 10
@@ -83,17 +87,20 @@ class GoogleEngine(BaseEngine):
             params["safe"] = safesearch_mapping.get(safesearch, "off")
 
             url = f"https://{google_info['subdomain']}/search?{urlencode(params)}"
-            response = requests.get(
+            # Closing the streamed response hands its connection back to the session, on errors too
+            with (session or requests).get(
                 url,
                 headers=google_info["headers"],
                 cookies=google_info["cookies"],
                 timeout=timeout,
-                proxies=proxy
-            )
-            response.raise_for_status()
-            self.detect_google_sorry(response)
-
-            dom = html.fromstring(response.text)
+                proxies=proxy,
+                stream=True
+            ) as response:
+                response.raise_for_status()
+                self.detect_google_sorry(response)
+                text = self.read_text(response, b'jscontroller="SC7lYd"', kwargs.get("num_results"))
+
+            dom = html.fromstring(text)
             results = []
 
             for result in dom.xpath('//div[contains(@jscontroller, "SC7lYd")]'):
@@ -102,13 +109,13 @@ class GoogleEngine(BaseEngine):
                 content = result.xpath('.//div[contains(@data-sncf, "1")]//text()')
 
                 if title and url and content:
-                    results.append({
-                        "title": " ".join(title).strip(),
-                        "url": url[0].split("&sa=U&")[0],  # پاکسازی URL
-                        "content": " ".join(content).strip(),
-                    })
+                    results.append(SearchResult(
+                        title=" ".join(title).strip(),
+                        url=url[0].split("&sa=U&")[0],  # پاکسازی URL
+                        content=" ".join(content).strip(),
+                    ))
 
             return {"results": results}
 
         except Exception as e:
-            return {"error": str(e)}
+            return self.error_result(e)
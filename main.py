@@ -2,16 +2,36 @@ from core.engine_loader import EngineLoader
 from core.plugin_loader import PluginLoader
 from core.config_loader import load_config
 from core.search_modes.normal import normal_search
-from core.search_modes.stream import stream_search
+from core.search_modes.stream import stream_search, stream_events, replay_response
 from core.search_modes.results_merger import results_merger
-from fastapi import FastAPI, Query, HTTPException
-from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
+from core.search_result import to_builtin, json_default, merged_to_dict
+from core.admission import AdmissionController, AdmissionRejected
+from core.proxy_pool import ProxyPool, get_proxy_pool_config
+from core.dns_cache import install_dns_cache
+from core.warmup import warm_up
+from core.plugin_cache import PluginCache
+from core.engine_stats import EngineStats
+from core.result_sessions import ResultSessionStore
+from core.local_index import LocalIndex
+from core.plugin_process_pool import PluginProcessPool
+from core.thumbnail_cache import ThumbnailCache
+from core.result_cache import ResultCache
+from core.heavy_hitters import SpaceSaving
+from core.refresh_ahead import RefreshAhead
+from core.stream_replay import StreamReplayStore
+from core.singleflight import Coalescer
+from fastapi import FastAPI, Query, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
+from starlette.background import BackgroundTask
 from typing import Optional
+from urllib.parse import urlparse
 import logging
 import asyncio
+import contextlib
 import json
 import os
+import time
 
 
 # Load settings from configs/config.yml
@@ -45,40 +65,332 @@ logger.info("Active Plugins: %s", plugin_status["active"])
 logger.warning("Failed Plugins: %s", plugin_status["failed"])
 
 
-def get_proxy_config(proxy: dict) -> dict:
+# Without proxies the pool has a single direct entry, engines still reuse its connections
+proxy_pool_configs = configs.get("proxy_pool") or {}
+proxy_pool = ProxyPool(
+    get_proxy_pool_config(configs["proxys"]) if configs["enabled_proxy"] else [],
+    strategy=proxy_pool_configs.get("strategy", "round_robin"),
+    max_failures=proxy_pool_configs.get("max_failures", 3),
+    rest_time=proxy_pool_configs.get("rest_time", 120),
+    captcha_rest_time=proxy_pool_configs.get("captcha_rest_time", 600),
+    connections=proxy_pool_configs.get("connections", 10),
+)
+logger.info("Proxy pool: %s", [entry.name for entry in proxy_pool.entries])
+
+# In-process DNS cache for engine and proxy hosts
+dns_cache_configs = configs.get("dns_cache") or {}
+if dns_cache_configs.get("ttl"):
+    dns_cache = install_dns_cache(dns_cache_configs["ttl"], dns_cache_configs.get("max_entries", 1024))
+else:
+    dns_cache = None
+
+# Outputs of pure pre-plugins are cached by query
+plugin_cache_configs = configs.get("pre_plugin_cache") or {}
+if plugin_cache_configs.get("max_entries"):
+    plugin_cache = PluginCache(plugin_cache_configs["max_entries"])
+else:
+    plugin_cache = None
+
+# Rolling latency, error and unique result statistics per engine, used by mode=fast
+fast_mode_configs = configs.get("fast_mode") or {}
+engine_stats = EngineStats(fast_mode_configs.get("window", 200))
+
+# Identical engine calls in flight at the same time share one upstream call
+coalescing_configs = configs.get("request_coalescing") or {}
+if coalescing_configs.get("enabled"):
+    coalescer = Coalescer()
+else:
+    coalescer = None
+
+# Engine results cached by search parameters, popular queries are refreshed before they go stale
+result_cache_configs = configs.get("result_cache") or {}
+if result_cache_configs.get("ttl"):
+    result_cache = ResultCache(result_cache_configs["ttl"], result_cache_configs.get("max_entries", 20000))
+else:
+    result_cache = None
+
+refresh_ahead_configs = configs.get("refresh_ahead") or {}
+if result_cache and refresh_ahead_configs.get("enabled"):
+    refresher = RefreshAhead(
+        SpaceSaving(refresh_ahead_configs.get("sketch_capacity", 1000)),
+        result_cache,
+        loader=loader,
+        logger=logger,
+        proxy_pool=proxy_pool,
+        engine_stats=engine_stats,
+        top_n=refresh_ahead_configs.get("top_n", 100),
+        refresh_before=refresh_ahead_configs.get("refresh_before", 30),
+        interval=refresh_ahead_configs.get("interval", 5),
+        max_refreshes_per_minute=refresh_ahead_configs.get("max_refreshes_per_minute", 60),
+        max_error_rate=refresh_ahead_configs.get("max_error_rate", 0.5),
+        max_concurrency=refresh_ahead_configs.get("max_concurrency", 4),
+        decay_interval=refresh_ahead_configs.get("decay_interval", 600),
+    )
+else:
+    refresher = None
+
+# Optional SimHash near-duplicate detection in the merger
+near_duplicates_configs = configs.get("near_duplicates") or {}
+if near_duplicates_configs.get("enabled"):
+    near_duplicates = {
+        "max_distance": near_duplicates_configs.get("max_distance", 6),
+        "bands": near_duplicates_configs.get("bands", 7),
+        "min_tokens": near_duplicates_configs.get("min_tokens", 4),
+    }
+else:
+    near_duplicates = None
+
+# Server-side merged result sessions, paged through with a cursor
+result_sessions_configs = configs.get("result_sessions") or {}
+if result_sessions_configs.get("enabled"):
+    result_sessions = ResultSessionStore(
+        ttl=result_sessions_configs.get("ttl", 300),
+        max_results=result_sessions_configs.get("max_results", 100000),
+    )
+else:
+    result_sessions = None
+
+# Replay buffers of streamed searches, so dropped clients can resume with Last-Event-ID
+stream_replay_configs = configs.get("stream_replay") or {}
+if stream_replay_configs.get("enabled"):
+    stream_replay = StreamReplayStore(
+        ttl=stream_replay_configs.get("ttl", 60),
+        max_streams=stream_replay_configs.get("max_streams", 1000),
+        max_events=stream_replay_configs.get("max_events", 1000),
+        max_running=stream_replay_configs.get("max_running", 100),
+    )
+else:
+    stream_replay = None
+
+# Local full-text index of served merged results
+local_index_configs = configs.get("local_index") or {}
+local_index = None
+if local_index_configs.get("enabled"):
+    try:
+        local_index = LocalIndex(
+            local_index_configs.get("path", "data/local_index.sqlite3"),
+            max_rows=local_index_configs.get("max_rows", 200000),
+            max_age_days=local_index_configs.get("max_age_days", 30),
+        )
+    except Exception as e:
+        logger.error("Local index disabled: %s", str(e))
+
+# Worker processes for plugins declared with "execution: process", started with the app
+plugin_pool_configs = configs.get("plugin_process_pool") or {}
+plugin_pool = None
+
+# Thumbnail proxy with an on-disk cache
+thumbnail_configs = configs.get("thumbnail_proxy") or {}
+if thumbnail_configs.get("enabled"):
+    thumbnail_cache = ThumbnailCache(
+        thumbnail_configs.get("directory", "data/thumbnails"),
+        max_bytes=thumbnail_configs.get("max_bytes", 256 * 1024 * 1024),
+        max_image_bytes=thumbnail_configs.get("max_image_bytes", 5 * 1024 * 1024),
+        default_ttl=thumbnail_configs.get("default_ttl", 86400),
+        timeout=thumbnail_configs.get("timeout", 10),
+        secret=thumbnail_configs.get("secret"),
+    )
+else:
+    thumbnail_cache = None
+
+
+def encode_results(results: dict, proxy_thumbnails: bool) -> dict:
     """
-    Converts proxy configuration from YAML into a format usable by the 'requests' library.
-    Example input:
-        {
-            "http": "http://127.0.0.1:8080",
-            "https": "http://127.0.0.1:8080"
-        }
+    Converts merged {index: (engine, result)} results to plain dicts for the response, pointing
+    thumbnails at /thumbnail if asked.
     """
-    if not isinstance(proxy, dict):
-        raise TypeError("Proxy config must be a dictionary.")
+    results = {index: merged_to_dict(engine, result) for index, (engine, result) in results.items()}
+    if proxy_thumbnails and thumbnail_cache:
+        for result in results.values():
+            thumbnail_cache.rewrite(result)
+    return results
+
+
+def encode_stream_result(result):
+    """json.dumps default hook for stream events, with thumbnails pointed at /thumbnail."""
+    return thumbnail_cache.rewrite(json_default(result))
+
+warmup_configs = configs.get("warmup") or {}
+warmup_state = {"done": not warmup_configs.get("enabled"), "report": None}
+
+# Limits of the /ws/search WebSocket endpoint
+websocket_configs = configs.get("websocket") or {}
+
+# Admission control for /search
+admission_configs = configs.get("admission_control") or {}
+if admission_configs.get("enabled"):
+    admission = AdmissionController(
+        max_in_flight=admission_configs.get("max_in_flight", 32),
+        max_queue=admission_configs.get("max_queue", 64),
+        max_queue_time=admission_configs.get("max_queue_time", 2),
+        per_client_limit=admission_configs.get("per_client_limit", 0),
+        low_priority_share=admission_configs.get("low_priority_share", 0.5),
+        retry_after=admission_configs.get("retry_after", 1),
+    )
+else:
+    admission = None
 
-    output_proxy = {}
 
-    for key in ("http", "https"):
-        value = proxy.get(key)
-        if value:
-            if not (value.startswith("http://") or value.startswith("https://")):
-                raise ValueError(f"{key} proxy must start with http:// or https://")
-            output_proxy[key] = value
+def is_prefetch(request: Request) -> bool:
+    """Browsers mark speculative requests with Sec-Purpose (or the older Purpose) header."""
+    purpose = request.headers.get("sec-purpose") or request.headers.get("purpose") or ""
+    return "prefetch" in purpose.lower()
 
-    return output_proxy if output_proxy else None
 
+async def admit(request: Request | WebSocket, priority: str):
+    """
+    Waits for a search slot and returns a callback that frees it (safe to call more than once).
+    Raises a 503 with Retry-After when capacity is used up.
+    """
+    if not admission:
+        return lambda: None
+
+    client = request.client.host if request.client else None
+    try:
+        await admission.acquire(client, priority)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=503, detail=e.reason, headers={"Retry-After": str(e.retry_after)})
+
+    released = {"value": False}
+    def release():
+        if not released["value"]:
+            released["value"] = True
+            admission.release(client, priority)
+    return release
+
+
+async def release_after(body_iterator, release):
+    """Keeps the admission slot of a streaming response until the stream ends."""
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+    finally:
+        release()
+
+
+def resolve_engines(engines, categories, mode=None, latency_budget_ms=None):
+    """Returns (selected engines, whether the adaptive selection picked them). Raises ValueError for engines not in the category."""
+    categories = categories.lower() if categories else "general"
+    if categories not in engine_status:
+        categories = "general"
 
-if configs["enabled_proxy"]:
-    proxy = get_proxy_config(configs["proxys"])
-else:
-    proxy = {}
+    if engines:
+        invalid_engines = [e for e in engines if e not in engine_status[categories]]
+        if invalid_engines:
+            raise ValueError(f"Engine(s) {invalid_engines} not found in category '{categories}'")
+        selected_engines = engines
+    else:
+        # If no engine is given, use category
+        selected_engines = engine_status[categories]
+
+    # Adaptive engine selection: only the engines expected to answer within the budget while keeping most unique results
+    adaptive = not engines and (mode == "fast" or latency_budget_ms is not None)
+    if adaptive:
+        selected_engines = engine_stats.select_engines(
+            selected_engines,
+            budget_ms=latency_budget_ms or fast_mode_configs.get("latency_budget_ms", 1500),
+            coverage=fast_mode_configs.get("coverage", 0.9),
+            min_samples=fast_mode_configs.get("min_samples", 5),
+            explore=fast_mode_configs.get("explore", 0.05),
+            stale_after=fast_mode_configs.get("stale_after", 600),
+        )
+    return selected_engines, adaptive
+
+
+def resolve_plugins(enabled_plugins):
+    """Determines and validates pre and post plugins. Returns (pre plugins, post plugins)."""
+    if not enabled_plugins:
+        return ploader.pre_plugins, ploader.post_plugins
+
+    selected_pre_plugins = []
+    selected_post_plugins = []
+    for plugin_name in enabled_plugins:
+        plugin_instance = ploader.get_plugin(plugin_name)
+        if not plugin_instance:
+            logger.warning("Plugin '%s' not found or failed to load.", plugin_name)
+            continue
+
+        plugin_type = plugin_instance.get_type().lower()
+        if plugin_type == "pre":
+            selected_pre_plugins.append(plugin_instance)
+        elif plugin_type == "post":
+            selected_post_plugins.append(plugin_instance)
+        else:
+            logger.warning("Plugin '%s' has unknown type '%s'", plugin_name, plugin_type)
+    return selected_pre_plugins, selected_post_plugins
+
+
+def make_search_params(q, pageno, safesearch, time_range, limit, language, country) -> dict:
+    return {
+        "query": q,
+        "page": pageno,
+        "safesearch": safesearch,
+        "time_range": time_range,
+        "num_results": limit, # For engines that can return a certain number of results by default
+        "locale": language,
+        "country": country,
+    }
 
 
 app = FastAPI()
+
+@app.on_event("startup")
+async def start_warmup():
+    """Warms up connections to every enabled engine in the background, /ready reports when it's done."""
+    if warmup_state["done"]:
+        return
+
+    async def run_warmup():
+        try:
+            warmup_state["report"] = await asyncio.to_thread(
+                warm_up,
+                loader=loader,
+                engine_names=configs["active_engines"] or engine_status["active"],
+                proxy_pool=proxy_pool,
+                logger=logger,
+                timeout=warmup_configs.get("timeout", 5),
+                max_threads=max_threads,
+            )
+            logger.info("Warm-up finished: %s", warmup_state["report"])
+        finally:
+            warmup_state["done"] = True
+
+    warmup_state["task"] = asyncio.create_task(run_warmup())
+
+@app.on_event("startup")
+async def start_plugin_pool():
+    """Starts and pre-warms the plugin process pool if any loaded plugin runs in a process."""
+    global plugin_pool
+    process_plugins = [name for name, plugin in ploader.plugins.items() if plugin.get_execution() == "process"]
+    if not process_plugins:
+        return
+    plugin_pool = await asyncio.to_thread(
+        PluginProcessPool,
+        workers=plugin_pool_configs.get("workers", 2),
+        timeout=plugin_pool_configs.get("timeout", 10),
+    )
+    logger.info("Plugin process pool started for: %s", process_plugins)
+
+@app.on_event("startup")
+async def start_refresh_ahead():
+    if refresher:
+        refresher.task = asyncio.create_task(refresher.run())
+
+@app.on_event("shutdown")
+async def stop_plugin_pool():
+    if plugin_pool:
+        plugin_pool.shutdown()
+
+@app.get("/ready")
+async def ready():
+    if not warmup_state["done"]:
+        return JSONResponse({"ready": False}, status_code=503)
+    return {"ready": True, "warmup": warmup_state["report"]}
+
 @app.get("/search")
 
 async def search(
+    request: Request,
     q: Optional[str] = Query(None, description="Search query"),
     engines: Optional[list[str]] = Query(configs["active_engines"], description="search engine names default = all"),
     enabled_plugins: Optional[list[str]] = Query(configs["active_plugins"], description="plugin names default = all"),
@@ -90,65 +402,96 @@ async def search(
     country: str = Query(configs["country"], description="Country to search"),
     categories: str = Query(configs["default_category"], description="# The default category for which results are requested."),
     api_mode: str = Query(configs["api_mode"], description="API behavior. stream, normal or merged"),
+    mode: Optional[str] = Query(None, description="Engine selection when no engines are given. 'fast' picks the smallest set of engines expected to meet the latency budget"),
+    latency_budget_ms: Optional[int] = Query(None, description="Latency budget for the adaptive engine selection. Implies mode=fast"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous merged response. Returns its next results, other parameters are ignored"),
+    page_size: Optional[int] = Query(None, ge=1, description="Number of merged results per response when result sessions are enabled"),
+    source: str = Query("engines", description="'engines' searches the engines, 'local' answers from the local index of previously served results"),
+    proxy_thumbnails: Optional[bool] = Query(thumbnail_configs.get("rewrite", False), description="Point thumbnails of merged and stream results at the /thumbnail proxy"),
+    stream_format: str = Query("json", description="Format of stream events. 'json' sends JSON lines, 'sse' sends Server-Sent Events (text/event-stream)"),
+    last_event_id: Optional[str] = Query(None, description="Id of the last stream event received. Resumes the stream after it (same as the Last-Event-ID header)"),
     ):
+    # Follow-up pages of a merged result session
+    if cursor:
+        if not result_sessions:
+            raise HTTPException(status_code=400, detail="Result sessions are disabled.")
+        parsed = result_sessions.parse_cursor(cursor)
+        session = result_sessions.get(parsed[0]) if parsed else None
+        if not session:
+            raise HTTPException(status_code=410, detail="Cursor is invalid or expired.")
+        release = await admit(request, "high")
+        try:
+            return await merged_session_page(session, parsed[1], page_size, proxy_thumbnails)
+        finally:
+            release()
+
+    # Resume a dropped stream from its replay buffer. EventSource clients send Last-Event-ID when they reconnect.
+    last_event_id = request.headers.get("last-event-id") or last_event_id
+    if api_mode == "stream" and last_event_id and stream_replay:
+        parsed = stream_replay.parse_event_id(last_event_id)
+        stream = stream_replay.resume(*parsed) if parsed else None
+        if stream:
+            encode_result = encode_stream_result if proxy_thumbnails and thumbnail_cache else None
+            return replay_response(stream, stream_replay, parsed[1], stream_format == "sse", encode_result)
+        logger.info("Stream event %s can't be resumed, searching again", last_event_id)
+
     # Send error if input query is missing
     if not q:
         raise HTTPException(status_code=400, detail="Search query input cannot be empty.")
 
 
-    categories = categories.lower() if categories else "general"
-    if categories not in engine_status:
-        categories = "general"
+    try:
+        selected_engines, adaptive = resolve_engines(engines, categories, mode, latency_budget_ms)
+    except ValueError as e:
+        return {"error": str(e)}
+    selected_pre_plugins, selected_post_plugins = resolve_plugins(enabled_plugins)
+    search_params = make_search_params(q, pageno, safesearch, time_range, limit, language, country)
 
-    if engines:
-        if categories in engine_status:
-            invalid_engines = [e for e in engines if e not in engine_status[categories]]
-            if invalid_engines:
-                return {
-                    "error": f"Engine(s) {invalid_engines} not found in category '{categories}'"
-                }
-        selected_engines = engines
-    else:
-        # If no engine is given, use category
-        selected_engines = engine_status[categories]
+    if api_mode not in ("normal", "stream", "merged"):
+        return "api_mode should be normal, stream or merged."
 
-    # Determining and validating pre and post plugins
-    selected_pre_plugins = []
-    selected_post_plugins = []
+    if source == "local":
+        if not local_index:
+            raise HTTPException(status_code=400, detail="The local index is disabled.")
+        return await local_search(q, limit, proxy_thumbnails)
 
-    if enabled_plugins:
-        for plugin_name in enabled_plugins:
-            plugin_instance = ploader.get_plugin(plugin_name)
-            if not plugin_instance:
-                logger.warning("Plugin '%s' not found or failed to load.", plugin_name)
-                continue
+    if refresher:
+        refresher.record(selected_engines, search_params)
 
-            plugin_type = plugin_instance.get_type().lower()
-            if plugin_type == "pre":
-                selected_pre_plugins.append(plugin_instance)
-            elif plugin_type == "post":
-                selected_post_plugins.append(plugin_instance)
-            else:
-                logger.warning("Plugin '%s' has unknown type '%s'", plugin_name, plugin_type)
-    else:
-        selected_pre_plugins = ploader.pre_plugins
-        selected_post_plugins = ploader.post_plugins
+    # Stream and prefetch requests are served with lower priority
+    priority = "low" if api_mode == "stream" or is_prefetch(request) else "high"
+    release = await admit(request, priority)
+    try:
+        response = await run_search(
+            api_mode=api_mode,
+            selected_engines=selected_engines,
+            search_params=search_params,
+            selected_pre_plugins=selected_pre_plugins,
+            selected_post_plugins=selected_post_plugins,
+            q=q,
+            limit=limit,
+            release=release,
+            adaptive=adaptive,
+            page_size=page_size,
+            proxy_thumbnails=proxy_thumbnails,
+            sse=stream_format == "sse",
+        )
+    except BaseException:
+        release()
+        raise
+
+    # Streaming responses free their slot themselves once the stream ends
+    if not isinstance(response, StreamingResponse):
+        release()
+    return response
 
-    # Creating search parameters
-    search_params = {
-        "query": q,
-        "page": pageno,
-        "safesearch": safesearch,
-        "time_range": time_range,
-        "num_results": limit, # For engines that can return a certain number of results by default
-        "locale": language,
-        "country": country,
-        "proxy": proxy
-    }
 
+async def run_search(api_mode, selected_engines, search_params, selected_pre_plugins, selected_post_plugins, q, limit, release, adaptive=False, page_size=None, proxy_thumbnails=False, sse=False):
     # Normal api mode takes all results from all engines. Then sends them all at once.
+    # normal_search blocks, so it runs in a worker thread to keep the event loop (and the admission queue) responsive.
     if api_mode == "normal":
-        results, pre_plugin_outputs = normal_search(
+        results, pre_plugin_outputs = await asyncio.to_thread(
+            normal_search,
             max_threads=max_threads,
             selected_engines=selected_engines,
             loader=loader,
@@ -156,23 +499,35 @@ async def search(
             search_params=search_params,
             selected_pre_plugins=selected_pre_plugins,
             q=q,
-            limit=limit,)
+            limit=limit,
+            proxy_pool=proxy_pool,
+            plugin_cache=plugin_cache,
+            engine_stats=engine_stats,
+            plugin_pool=plugin_pool,
+            result_cache=result_cache,
+            coalescer=coalescer,
+        )
 
         number_of_results = 0
         for engine_data in results.values():
             if isinstance(engine_data, dict) and "results" in engine_data and isinstance(engine_data["results"], list):
                 number_of_results += len(engine_data["results"])
 
-        return {
+        # Results stay SearchResult objects until here, the API boundary
+        response = {
             "number_of_results" : number_of_results,
-            "results": results,
-            "pre_plugins": pre_plugin_outputs
+            "results": to_builtin(results),
+            "pre_plugins": to_builtin(pre_plugin_outputs)
             }
+        if adaptive:
+            response["selected_engines"] = selected_engines
+        return response
 
 
     # In streaming API mode, the results of engines and pre-plugins are executed in parallel and sent separately to the client without delay.
     elif api_mode == "stream":
-        return await stream_search(
+        replay = stream_replay if stream_replay and stream_replay.has_capacity() else None
+        response = await stream_search(
             selected_engines=selected_engines,
             loader=loader,
             search_params=search_params,
@@ -180,28 +535,263 @@ async def search(
             selected_pre_plugins=selected_pre_plugins,
             selected_post_plugins=selected_post_plugins,
             q=q,
+            proxy_pool=proxy_pool,
+            plugin_cache=plugin_cache,
+            engine_stats=engine_stats,
+            announce_engines=adaptive,
+            plugin_pool=plugin_pool,
+            encode_result=encode_stream_result if proxy_thumbnails and thumbnail_cache else None,
+            result_cache=result_cache,
+            coalescer=coalescer,
+            sse=sse,
+            replay=replay,
+            on_done=release if replay else None,
         )
+        # The slot is freed when the stream ends. The background task covers clients that disconnect before the first chunk.
+        # With replay the search outlives its client, so the slot is freed when the search itself is done.
+        if not replay:
+            response.body_iterator = release_after(response.body_iterator, release)
+            response.background = BackgroundTask(release)
+        return response
 
     elif api_mode == "merged":
-        results, pre_plugin_outputs = normal_search(
-            max_threads=max_threads,
-            selected_engines=selected_engines,
-            loader=loader,
-            logger=logger,
-            search_params=search_params,
-            selected_pre_plugins=selected_pre_plugins,
-            q=q,
-            limit=limit,)
-        results = results_merger(results)
-        number_of_results = len(results)
-        return {
-            "number_of_results" : number_of_results,
-            "results": results,
-            "pre_plugins": pre_plugin_outputs
-            }
+        # Answer in milliseconds instead of waiting for engine timeouts when no selected engine can be used
+        if selected_engines and local_index and local_index_configs.get("fallback", True) and not any(map(engine_usable, selected_engines)):
+            logger.warning("Every engine is circuit-broken for '%s', answering from the local index", q)
+            return await local_search(q, limit, proxy_thumbnails)
+
+        results, pre_plugin_outputs, answered = await merged_search(selected_engines, search_params, selected_pre_plugins, q, limit)
+
+        # Degraded service from the local index when every engine failed (CAPTCHA storms, network problems)
+        if not answered and local_index and local_index_configs.get("fallback", True):
+            logger.warning("Every engine failed for '%s', answering from the local index", q)
+            response = await local_search(q, limit, proxy_thumbnails)
+            response["pre_plugins"] = to_builtin(pre_plugin_outputs)
+            return response
+
+        # Keep the merged set on the server, so the next pages come from memory through the cursor
+        if result_sessions:
+            session = result_sessions.create(search_params, selected_engines, limit, list(results.values()), pre_plugin_outputs)
+            response = await merged_session_page(session, 0, page_size, proxy_thumbnails)
+        else:
+            number_of_results = len(results)
+            # Results stay SearchResult objects until here, the API boundary
+            response = {
+                "number_of_results" : number_of_results,
+                "results": encode_results(results, proxy_thumbnails),
+                "pre_plugins": to_builtin(pre_plugin_outputs)
+                }
+        if adaptive:
+            response["selected_engines"] = selected_engines
+        return response
+
+
+async def merged_search(selected_engines, search_params, selected_pre_plugins, q, limit):
+    """Searches all engines and merges their results. Returns (merged results, pre plugin outputs, engines that answered)."""
+    results, pre_plugin_outputs = await asyncio.to_thread(
+        normal_search,
+        max_threads=max_threads,
+        selected_engines=selected_engines,
+        loader=loader,
+        logger=logger,
+        search_params=search_params,
+        selected_pre_plugins=selected_pre_plugins,
+        q=q,
+        limit=limit,
+        proxy_pool=proxy_pool,
+        plugin_cache=plugin_cache,
+        engine_stats=engine_stats,
+        plugin_pool=plugin_pool,
+        result_cache=result_cache,
+        coalescer=coalescer,
+    )
+    answered = [name for name, data in results.items() if isinstance(data, dict) and not data.get("error")]
+    input_size = sum(len(data["results"]) for data in results.values() if isinstance(data, dict) and isinstance(data.get("results"), list))
+    merge_started = time.perf_counter()
+    results = results_merger(results, near_duplicates)
+    merge_time_ms = (time.perf_counter() - merge_started) * 1000
+    engine_stats.record_merge(answered, results, merge_time_ms, input_size)
+    logger.debug("Merged %d results into %d in %.1f ms", input_size, len(results), merge_time_ms)
+    if local_index:
+        local_index.submit(list(results.values()))
+    return results, pre_plugin_outputs, answered
+
+
+def engine_usable(engine_name) -> bool:
+    """False while the engine is circuit-broken: every proxy serving it rests, or its recent calls all failed."""
+    if not proxy_pool.available(engine_name):
+        return False
+    return not engine_stats.failing(
+        engine_name,
+        recent=local_index_configs.get("failing_calls", 5),
+        retry_after=local_index_configs.get("retry_after", 30),
+    )
+
+
+async def local_search(q, limit, proxy_thumbnails=False):
+    """Answers a query from the local index of previously served results."""
+    results = await asyncio.to_thread(local_index.search, q, limit)
+    return {
+        "number_of_results": len(results),
+        "results": encode_results(dict(enumerate(results)), proxy_thumbnails),
+        "pre_plugins": {},
+        "source": "local",
+        }
+
+
+async def merged_session_page(session, offset, page_size, proxy_thumbnails=False):
+    """
+    Returns the merged results of a session starting at offset. Engines are only queried again
+    (for their next page) when the stored set runs out.
+    """
+    page_size = page_size or result_sessions_configs.get("page_size")
+
+    def runs_out():
+        if session.exhausted:
+            return False
+        # Without a page size every stored result is returned, so only fetch when all of them were served
+        return offset + page_size > len(session.results) if page_size else offset >= len(session.results)
+
+    async with session.lock:
+        for _ in range(result_sessions_configs.get("max_fetches", 3)):
+            if not runs_out():
+                break
+            search_params = {**session.search_params, "page": session.page + 1}
+            results, _, _ = await merged_search(session.selected_engines, search_params, [], search_params["query"], session.limit)
+            session.page += 1
+            if not result_sessions.extend(session, list(results.values())):
+                session.exhausted = True
+
+    end = offset + page_size if page_size else len(session.results)
+    page = session.results[offset:end]
+    more = end < len(session.results) or not session.exhausted
+    return {
+        "number_of_results": len(page),
+        "results": encode_results({index: result for index, result in enumerate(page, start=offset)}, proxy_thumbnails),
+        "pre_plugins": to_builtin(session.pre_plugin_outputs),
+        "cursor": result_sessions.make_cursor(session.id, offset + len(page)) if more else None,
+        }
+
+
+@app.websocket("/ws/search")
+async def ws_search(websocket: WebSocket):
+    """
+    Runs many stream mode searches over one connection.
+
+    The client sends {"type": "search", "id": ..., "q": ..., <other /search parameters>} and
+    {"type": "cancel", "id": ...}. Every event of a search carries its id. A search with an id
+    that is still running replaces it, and cancelled searches stop their pending upstream work.
+    At most max_concurrent searches of a connection run at once, the others wait for a slot.
+    """
+    await websocket.accept()
+    send_lock = asyncio.Lock()
+    slots = asyncio.Semaphore(websocket_configs.get("max_concurrent", 4))
+    tasks = {}
+
+    async def send(event, encode_result=None):
+        async with send_lock:
+            await websocket.send_text(json.dumps(event, default=encode_result or json_default))
+
+    async def run(query_id, message):
+        try:
+            q = message.get("q")
+            if not q:
+                raise ValueError("Search query input cannot be empty.")
+            selected_engines, adaptive = resolve_engines(
+                message.get("engines") or configs["active_engines"],
+                message.get("categories", configs["default_category"]),
+                message.get("mode"),
+                message.get("latency_budget_ms"),
+            )
+            selected_pre_plugins, selected_post_plugins = resolve_plugins(message.get("enabled_plugins", configs["active_plugins"]))
+            limit = message.get("limit", configs["limit"])
+            search_params = make_search_params(
+                q,
+                message.get("pageno", configs["pageno"]),
+                message.get("safesearch", configs["safesearch"]),
+                message.get("time_range", ""),
+                limit,
+                message.get("language", configs["language"]),
+                message.get("country", configs["country"]),
+            )
+            proxy_thumbnails = message.get("proxy_thumbnails", thumbnail_configs.get("rewrite", False))
+            encode_result = encode_stream_result if proxy_thumbnails and thumbnail_cache else None
+            if refresher:
+                refresher.record(selected_engines, search_params)
+
+            async with slots:
+                release = await admit(websocket, "low")
+                try:
+                    events = stream_events(
+                        selected_engines=selected_engines,
+                        loader=loader,
+                        search_params=search_params,
+                        limit=limit,
+                        selected_pre_plugins=selected_pre_plugins,
+                        selected_post_plugins=selected_post_plugins,
+                        q=q,
+                        proxy_pool=proxy_pool,
+                        plugin_cache=plugin_cache,
+                        engine_stats=engine_stats,
+                        announce_engines=adaptive,
+                        plugin_pool=plugin_pool,
+                        result_cache=result_cache,
+                        coalescer=coalescer,
+                    )
+                    async with contextlib.aclosing(events):
+                        async for event in events:
+                            await send({**event, "id": query_id}, encode_result)
+                finally:
+                    release()
+        except HTTPException as e:
+            await send({"type": "error", "id": query_id, "error": e.detail})
+        except (ValueError, TypeError) as e:
+            await send({"type": "error", "id": query_id, "error": str(e)})
+        except Exception as e:
+            logger.error("WebSocket search %s failed: %s", query_id, str(e))
+            await send({"type": "error", "id": query_id, "error": str(e)})
+        finally:
+            if tasks.get(query_id) is asyncio.current_task():
+                del tasks[query_id]
+
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                await send({"type": "error", "id": None, "error": "Messages must be JSON objects."})
+                continue
+            if not isinstance(message, dict):
+                await send({"type": "error", "id": None, "error": "Messages must be JSON objects."})
+                continue
+
+            query_id = message.get("id")
+            # Ids are dict keys and are sent back with every event
+            if isinstance(query_id, bool) or not isinstance(query_id, (str, int)):
+                await send({"type": "error", "id": None, "error": "'id' must be a string or an integer."})
+                continue
+            if message.get("type") == "cancel":
+                task = tasks.pop(query_id, None)
+                if task:
+                    task.cancel()
+                    await send({"type": "cancelled", "id": query_id})
+            elif message.get("type") == "search":
+                # A new search under a running id supersedes it
+                previous = tasks.pop(query_id, None)
+                if previous:
+                    previous.cancel()
+                if len(tasks) >= websocket_configs.get("max_queries", 32):
+                    await send({"type": "error", "id": query_id, "error": "Too many searches on this connection."})
+                    continue
+                tasks[query_id] = asyncio.create_task(run(query_id, message))
+            else:
+                await send({"type": "error", "id": query_id, "error": "Unknown message type, expected 'search' or 'cancel'."})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks.values():
+            task.cancel()
 
-    else:
-        return "api_mode should be normal, stream or merged."
 
 # Mount static folder
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -211,6 +801,51 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 async def favicon():
     return FileResponse("static/favicon.ico")
 
+@app.get("/thumbnail")
+async def thumbnail(
+    request: Request,
+    url: str = Query(..., description="Thumbnail URL"),
+    sig: str = Query(..., description="Signature of the URL, as given in rewritten results"),
+    ):
+    if not thumbnail_cache:
+        raise HTTPException(status_code=404, detail="The thumbnail proxy is disabled.")
+    if not thumbnail_cache.verify(url, sig):
+        raise HTTPException(status_code=403, detail="Invalid thumbnail signature.")
+    if urlparse(url).scheme not in ("http", "https"):
+        raise HTTPException(status_code=400, detail="Only http and https thumbnails are supported.")
+
+    try:
+        path, meta = await thumbnail_cache.get(url, proxy_pool)
+    except Exception as e:
+        logger.warning("Thumbnail %s failed: %s", url, str(e))
+        raise HTTPException(status_code=502, detail="Could not fetch the thumbnail.")
+
+    etag = thumbnail_cache.etag(url, meta)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max(0, int(meta['expires'] - time.time()))}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=meta["content_type"], headers=headers)
+
+@app.get("/stats")
+async def stats():
+    return {
+        "admission": admission.stats() if admission else None,
+        "proxies": proxy_pool.stats(),
+        "dns_cache": dns_cache.stats() if dns_cache else None,
+        "pre_plugin_cache": plugin_cache.stats() if plugin_cache else None,
+        "engines": engine_stats.stats(),
+        "engine_bytes": {name: loader.get_engine(name).byte_stats for name in engine_status["active"]},
+        "merger": engine_stats.merge_stats(),
+        "result_sessions": result_sessions.stats() if result_sessions else None,
+        "local_index": local_index.stats() if local_index else None,
+        "plugin_process_pool": plugin_pool.stats() if plugin_pool else None,
+        "thumbnails": thumbnail_cache.stats() if thumbnail_cache else None,
+        "result_cache": result_cache.stats() if result_cache else None,
+        "refresh_ahead": refresher.stats() if refresher else None,
+        "stream_replay": stream_replay.stats() if stream_replay else None,
+        "coalescing": coalescer.stats() if coalescer else None,
+    }
+
 @app.get("/")
 async def root():
     return JSONResponse({
@@ -0,0 +1,32 @@
+from core.search_result import SearchResult, merged_to_dict
+from core.search_modes.results_merger import results_merger
+
+
+def test_merger_shares_results_and_names_engines():
+    short = SearchResult(title="MOA", url="https://example.com/", content="a")
+    long = SearchResult(title="MOA search", url="https://example.com/", content="b")
+    other = SearchResult(title="Other", url="https://example.org/", content="c")
+
+    merged = results_merger({"google": {"results": [short, other]}, "bing": {"results": [long]}})
+
+    assert merged[0] == (["bing", "google"], long)
+    assert merged[1][1] is other
+    assert [merged_to_dict(*pair)["engine"] for pair in merged.values()] == [["bing", "google"], "google"]
+    # The engines' own results are left as they were
+    assert (short.engine, long.engine, other.engine) == (None, None, None)
+
+
+def test_merger_converts_dict_results():
+    merged = results_merger({"legacy": {"results": [{"title": "MOA", "url": "https://example.com/", "content": "a"}, {"title": "No URL"}]}})
+
+    assert len(merged) == 1
+    engine, result = merged[0]
+    assert engine == "legacy"
+    assert merged_to_dict(engine, result) == {"title": "MOA", "url": "https://example.com/", "content": "a", "engine": "legacy"}
+
+
+def test_search_result_dict_access():
+    result = SearchResult(title="MOA", url="https://example.com/")
+    assert "title" in result and "thumbnail" not in result
+    result["thumbnail"] = "https://example.com/t.png"
+    assert result["thumbnail"] == "https://example.com/t.png"
@@ -0,0 +1,70 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.singleflight import Coalescer
+
+
+class CountingCall:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return {"results": ["moa"]}
+
+
+def run_loop(main, executor):
+    # Not asyncio.run: a stuck default executor must not block the test from failing
+    loop = asyncio.new_event_loop()
+    loop.set_default_executor(executor)
+    try:
+        return loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+
+def test_sync_and_async_waiters_share_one_call():
+    coalescer = Coalescer()
+    call = CountingCall()
+
+    async def main():
+        sync_waiters = [asyncio.to_thread(coalescer.run, "key", call) for _ in range(3)]
+        async_waiters = [coalescer.run_async("key", call) for _ in range(3)]
+        return await asyncio.wait_for(asyncio.gather(*async_waiters, *sync_waiters), timeout=5)
+
+    results = run_loop(main, ThreadPoolExecutor(8))
+    assert results == [{"results": ["moa"]}] * 6
+    assert call.calls == 1
+    assert coalescer.stats()["in_flight"] == 0
+
+
+def test_sync_waiters_take_over_async_call_stuck_in_full_executor():
+    # Two blocking searches fill the default executor, then join a coroutine's call that is queued behind them
+    coalescer = Coalescer()
+    call = CountingCall()
+    leader_joined = threading.Event()
+
+    def normal_search():
+        leader_joined.wait(5)
+        return coalescer.run("key", call)
+
+    async def main():
+        followers = [asyncio.ensure_future(asyncio.to_thread(normal_search)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        leader = asyncio.ensure_future(coalescer.run_async("key", call))
+        await asyncio.sleep(0.05)
+        leader_joined.set()
+        return await asyncio.wait_for(asyncio.gather(leader, *followers), timeout=5)
+
+    results = run_loop(main, ThreadPoolExecutor(2))
+    assert results == [{"results": ["moa"]}] * 3
+    assert call.calls == 1
+    stats = coalescer.stats()
+    assert stats["taken_over"] == 1
+    assert stats["in_flight"] == 0
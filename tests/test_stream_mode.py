@@ -0,0 +1,57 @@
+import asyncio
+import json
+import pytest
+
+pytest.importorskip("fastapi")
+
+from core.base_plugin import BasePlugin
+from core.plugin_cache import PluginCache
+from core.search_modes.stream import stream_search
+
+
+class EchoPrePlugin(BasePlugin):
+    def __init__(self, config=None):
+        self.config = config or {"type": "pre"}
+
+    def run(self, query, results=None):
+        return {"echo": query}
+
+
+class EmptyLoader:
+    def get_engine(self, name):
+        return None
+
+
+def collect_events(**kwargs):
+    async def run():
+        response = await stream_search(
+            selected_engines=[],
+            loader=EmptyLoader(),
+            search_params={"query": "moa"},
+            limit=None,
+            selected_post_plugins=[],
+            q="moa",
+            **kwargs,
+        )
+        return [json.loads(chunk) async for chunk in response.body_iterator]
+
+    return asyncio.run(run())
+
+
+def pre_plugin_events(events):
+    return [event for event in events if event["type"] == "pre_plugin_result"]
+
+
+def test_stream_runs_pre_plugin():
+    events = collect_events(selected_pre_plugins=[EchoPrePlugin()])
+    assert pre_plugin_events(events) == [{"type": "pre_plugin_result", "name": "EchoPrePlugin", "result": {"echo": "moa"}}]
+    assert events[-1]["type"] == "done"
+
+
+def test_stream_runs_inline_pre_plugin_with_cache():
+    plugin = EchoPrePlugin({"type": "pre", "pure": True, "inline": True})
+    plugin_cache = PluginCache(16)
+    for _ in range(2):
+        events = collect_events(selected_pre_plugins=[plugin], plugin_cache=plugin_cache)
+        assert pre_plugin_events(events) == [{"type": "pre_plugin_result", "name": "EchoPrePlugin", "result": {"echo": "moa"}}]
+    assert plugin_cache.stats()["hits"] == 1